@@ -0,0 +1,256 @@
+"""Benchmark of every chart and poverty cleaning step on synthetic data.
+
+Each `chart_*` function of the chart modules, and each `clean_*` step of the
+poverty extraction, is run on synthetic data at several scales (see
+`synthetic.py`), fully offline. Charts are timed from a cold start: the
+datasets and lookups held in memory are dropped before every run, so reading
+the (parquet) raw files is part of the time. The peak memory allocated by
+Python during a run is measured separately with tracemalloc, which slows
+the code down.
+
+Results are appended to .logs/benchmarks.jsonl with the commit they were
+measured at, and compared with the latest results of the previous commit.
+
+Usage:
+    python scripts/benchmarks/charts.py [--scales 1 10 100] [--repeat N] [name ...]
+"""
+
+import argparse
+import inspect
+import json
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterator
+
+import numpy as np
+
+from scripts import common, datasets
+from scripts.benchmarks import synthetic
+from scripts.charts import (
+    education,
+    employment,
+    hdr,
+    legislation,
+    maternal_mortality,
+    poverty,
+)
+from scripts.config import PATHS
+from scripts.extraction_tools import extract_poverty
+from scripts.logger import logger
+
+RESULTS = PATHS.logs / "benchmarks.jsonl"
+
+CHART_MODULES = [education, employment, hdr, legislation, maternal_mortality, poverty]
+
+
+def chart_benchmarks() -> dict[str, Callable[[], None]]:
+    """Return every chart function, by name"""
+
+    return {
+        f"{module.__name__.split('.')[-1]}.{name}": func
+        for module in CHART_MODULES
+        for name, func in inspect.getmembers(module, inspect.isfunction)
+        if name.startswith("chart_") and func.__module__ == module.__name__
+    }
+
+
+def extraction_benchmarks(scale: int) -> dict[str, Callable[[], None]]:
+    """Return the cleaning steps of the poverty extraction, applied to
+    synthetic workbook sheets, by name"""
+
+    sheets = synthetic.poverty_workbook(
+        range(scale), np.random.default_rng(synthetic.SEED)
+    )
+    mapper = extract_poverty.get_mapper(sheets["variables"])
+
+    return {
+        "extract_poverty.get_mapper": lambda: extract_poverty.get_mapper(
+            sheets["variables"]
+        ),
+        "extract_poverty.clean_country_data": lambda: (
+            extract_poverty.clean_country_data(sheets["country_data"], mapper)
+        ),
+        "extract_poverty.clean_region_data": lambda: (
+            extract_poverty.clean_region_data(sheets["regional_data"], mapper)
+        ),
+    }
+
+
+def clear_memory() -> None:
+    """Drop every dataset and lookup held in memory"""
+
+    datasets.clear_cache()
+    common.clear_lookups()
+
+
+@contextmanager
+def synthetic_paths(raw_data: Path) -> Iterator[None]:
+    """Point the scripts to a folder of synthetic raw data
+
+    Charts are written to a temporary folder, and the afrobarometer cache to a
+    temporary cache, so that the real outputs are left untouched.
+    """
+
+    original = PATHS.raw_data, PATHS.output, PATHS.cache
+
+    with TemporaryDirectory() as tmp:
+        PATHS.raw_data = raw_data
+        PATHS.output = Path(tmp) / "output"
+        PATHS.cache = Path(tmp) / "cache"
+        PATHS.output.mkdir()
+        clear_memory()
+        try:
+            yield
+        finally:
+            PATHS.raw_data, PATHS.output, PATHS.cache = original
+            clear_memory()
+
+
+def measure(func: Callable[[], None], repeat: int = 3) -> dict[str, float]:
+    """Time a function from a cold start, and measure its peak memory
+
+    The function is run once first, so that files written on first use (such
+    as parquet twins) are not part of the measurements.
+
+    Args:
+        func: function to measure
+        repeat: number of timed runs. The fastest one is kept.
+
+    Returns:
+        dictionary with the time taken, in seconds, and the peak memory
+        allocated, in MB
+    """
+
+    func()
+
+    times = []
+    for _ in range(repeat):
+        clear_memory()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    clear_memory()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(times), "peak_mb": peak / 1e6}
+
+
+def _commit() -> str:
+    """Return the current commit, marked as dirty if the tree has changes"""
+
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=PATHS.project, capture_output=True, text=True
+        ).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+
+    return commit + ("-dirty" if git("status", "--porcelain", "--", "scripts") else "")
+
+
+def _read_results() -> list[dict]:
+    if not RESULTS.exists():
+        return []
+
+    with open(RESULTS) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _previous(results: list[dict], commit: str) -> dict[tuple, dict]:
+    """Return the latest result of each benchmark measured at another commit"""
+
+    previous = {}
+    for result in results:
+        if result["commit"] != commit:
+            previous[result["name"], result["scale"]] = result
+
+    return previous
+
+
+def benchmark(
+    scales: tuple = synthetic.SCALES, repeat: int = 3, names: list | None = None
+) -> list[dict]:
+    """Run the benchmarks and store their results
+
+    Args:
+        scales: scales of the synthetic data
+        repeat: number of timed runs of each benchmark
+        names: optional names of the benchmarks to run, e.g.
+            "hdr.chart_gii_ridgeline". All benchmarks are run by default.
+
+    Returns:
+        list of results, with the commit, scale, name, time and peak memory
+        of each benchmark
+    """
+
+    commit = _commit()
+    previous = _previous(_read_results(), commit)
+    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    results = []
+    for scale in scales:
+        with synthetic_paths(synthetic.raw_data(scale)):
+            benchmarks = chart_benchmarks() | extraction_benchmarks(scale)
+            for name, func in benchmarks.items():
+                if names and name not in names:
+                    continue
+
+                result = {
+                    "commit": commit,
+                    "timestamp": timestamp,
+                    "scale": scale,
+                    "name": name,
+                    **measure(func, repeat),
+                }
+                results.append(result)
+
+                message = (
+                    f"{name} at {scale}x: {result['seconds']:.3f}s, "
+                    f"{result['peak_mb']:.1f}MB"
+                )
+                before = previous.get((name, scale))
+                if before is not None:
+                    change = result["seconds"] / before["seconds"] - 1
+                    message += f" ({change:+.0%} since {before['commit']})"
+                logger.info(message)
+
+    RESULTS.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS, "a") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark charts on synthetic data")
+    parser.add_argument(
+        "names", nargs="*", help="benchmarks to run (default: all benchmarks)"
+    )
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=list(synthetic.SCALES),
+        help="scales of the synthetic data (default: 1 10 100)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of timed runs of each benchmark (default: 3)",
+    )
+    args = parser.parse_args()
+
+    benchmark(tuple(args.scales), args.repeat, args.names)
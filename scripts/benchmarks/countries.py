@@ -0,0 +1,53 @@
+"""Benchmark of country code conversion against country_converter.
+
+Converts the ISO3 column of the MMR country estimates to continents, once with
+`coco.convert` and once with `countries.convert`, checks that both give the same
+result and logs the time each took.
+
+Usage:
+    python scripts/benchmarks/countries.py
+"""
+
+import time
+
+import country_converter as coco
+
+from scripts import countries, datasets
+from scripts.logger import logger
+
+
+def benchmark(name: str = "mmr2020_country_estimates", column: str = "iso_code"):
+    """Time the conversion of a column of ISO3 codes to continents
+
+    Args:
+        name: name of the raw dataset to read the codes from
+        column: column of the dataset holding ISO3 codes
+
+    Returns:
+        dictionary with the time taken by each method, in seconds
+    """
+
+    codes = datasets.load(name, columns=[column])[column]
+
+    start = time.perf_counter()
+    expected = coco.convert(codes, to="continent", not_found="not found")
+    coco_time = time.perf_counter() - start
+
+    countries.reference_table()  # build or read the table outside of the timing
+    start = time.perf_counter()
+    result = countries.convert(codes, to="continent", not_found="not found")
+    table_time = time.perf_counter() - start
+
+    if result.tolist() != list(expected):
+        raise ValueError("countries.convert does not match coco.convert")
+
+    logger.info(
+        f"Converted {len(codes)} codes: coco {coco_time:.3f}s, "
+        f"reference table {table_time:.3f}s ({coco_time / table_time:.0f}x faster)"
+    )
+
+    return {"coco": coco_time, "reference_table": table_time}
+
+
+if __name__ == "__main__":
+    benchmark()
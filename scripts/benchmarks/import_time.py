@@ -0,0 +1,107 @@
+"""Benchmark of the cold start time of the chart modules.
+
+Each module is imported in a fresh interpreter with `python -X importtime`.
+The benchmark fails if a module takes longer than the budget to import, or if
+it imports one of the slow packages which should only be imported when a
+function actually needs them.
+
+Usage:
+    python scripts/benchmarks/import_time.py [--budget SECONDS]
+"""
+
+import argparse
+import subprocess
+import sys
+
+from scripts.config import PATHS
+from scripts.logger import logger
+
+MODULES = [
+    "scripts.common",
+    "scripts.charts.education",
+    "scripts.charts.employment",
+    "scripts.charts.hdr",
+    "scripts.charts.legislation",
+    "scripts.charts.maternal_mortality",
+    "scripts.charts.poverty",
+    "scripts.charts.update_charts",
+]
+
+# packages which are slow to import, and only needed by a few functions
+DEFERRED = ["bblocks", "country_converter", "pyreadstat", "wbgapi"]
+
+
+def import_time(module: str, repeat: int = 3) -> tuple[float, set[str]]:
+    """Import a module in a new interpreter and return how long it took
+
+    Args:
+        module: name of the module to import
+        repeat: number of imports. The fastest one is kept.
+
+    Returns:
+        the import time in seconds, and the names of all the modules imported
+    """
+
+    times, imported = [], set()
+
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=PATHS.project,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # lines look like "import time: self [us] | cumulative | package"
+        lines = [
+            line.split("|")
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:") and "cumulative" not in line
+        ]
+        imported = {name.strip() for *_, name in lines}
+        times.append(int(lines[-1][1]) / 1e6)
+
+    return min(times), imported
+
+
+def benchmark(budget: float = 1.0) -> dict[str, float]:
+    """Time the import of each chart module
+
+    Args:
+        budget: maximum import time of a module, in seconds
+
+    Returns:
+        dictionary with the import time of each module, in seconds
+
+    Raises:
+        RuntimeError: if a module is over budget or imports a deferred package
+    """
+
+    timings, problems = {}, []
+
+    for module in MODULES:
+        timings[module], imported = import_time(module)
+        logger.info(f"Imported {module} in {timings[module]:.3f}s")
+
+        if timings[module] > budget:
+            problems.append(f"{module} takes {timings[module]:.3f}s to import")
+
+        slow = sorted({m.split(".")[0] for m in imported} & set(DEFERRED))
+        if slow:
+            problems.append(f"{module} imports {', '.join(slow)}")
+
+    if problems:
+        raise RuntimeError("; ".join(problems))
+
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark module import times")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=1.0,
+        help="maximum import time of a module, in seconds (default: 1)",
+    )
+    benchmark(parser.parse_args().budget)
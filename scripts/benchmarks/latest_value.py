@@ -0,0 +1,68 @@
+"""Benchmark of `common.latest_value` against groupby().idxmax().
+
+Takes the latest value of every indicator for every entity in
+world_bank_wdi.csv, once with the idxmax approach previously used by the
+charts and once with `common.latest_value`, checks that both give the same
+rows and logs the time each took.
+
+Usage:
+    python scripts/benchmarks/latest_value.py
+"""
+
+import time
+
+import pandas as pd
+
+from scripts import common, datasets
+from scripts.logger import logger
+
+
+def latest_value_idxmax(
+    df: pd.DataFrame, value_col: str, grouping_col: list, date_col: str
+) -> pd.DataFrame:
+    """The groupby().idxmax() implementation replaced by common.latest_value"""
+
+    return (
+        df.dropna(subset=[value_col])
+        .loc[lambda d: d.groupby(grouping_col, observed=True)[date_col].idxmax()]
+        .reset_index(drop=True)
+    )
+
+
+def _timed(func, *args, repeat: int = 5) -> tuple[float, pd.DataFrame]:
+    """Return the fastest of several runs of a function, and its result"""
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+
+    return min(times), result
+
+
+def benchmark() -> dict[str, float]:
+    """Time both implementations on world_bank_wdi.csv
+
+    Returns:
+        dictionary with the time taken by each implementation, in seconds
+    """
+
+    df = datasets.load("world_bank_wdi").assign(year=datasets.years)
+    args = (df, "value", ["indicator_code", "iso_code"], "year")
+
+    idxmax_time, expected = _timed(latest_value_idxmax, *args)
+    engine_time, result = _timed(common.latest_value, *args)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+    logger.info(
+        f"Latest values of {len(df)} rows: idxmax {idxmax_time:.3f}s, "
+        f"latest_value {engine_time:.3f}s ({idxmax_time / engine_time:.1f}x faster)"
+    )
+
+    return {"idxmax": idxmax_time, "latest_value": engine_time}
+
+
+if __name__ == "__main__":
+    benchmark()
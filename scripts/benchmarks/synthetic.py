@@ -0,0 +1,619 @@
+"""Synthetic versions of the raw datasets, for benchmarks.
+
+Each generator returns a dataframe with the same columns, dtypes, indicator
+codes and entity names as the real raw file, so that every chart can be built
+from it. Values are random. At scale 1 datasets have about as many rows as the
+real files. Larger scales add copies of the entities (countries, regions,
+survey respondents) with synthetic codes, rather than years or indicators,
+which the charts select by name.
+
+Generated data is written to a folder of the cache, keyed on the scale and on
+the source of this module, and reused until either changes.
+
+Usage:
+    python scripts/benchmarks/synthetic.py [--scales 1 10 100]
+"""
+
+import argparse
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from scripts import countries
+from scripts.config import PATHS
+from scripts.logger import logger
+
+SCALES = (1, 10, 100)
+
+SEED = 2023
+
+# World Bank aggregates which the charts select by code
+WB_AGGREGATES = {
+    "WLD": "World",
+    "LIC": "Low income",
+    "LMC": "Lower middle income",
+    "UMC": "Upper middle income",
+    "HIC": "High income",
+    "SSF": "Sub Saharan Africa",
+}
+
+WB_INDICATORS = {
+    "world_bank_wdi": [
+        "SP.POP.TOTL.FE.IN",
+        "SP.POP.TOTL",
+        "SH.STA.MMRT",
+        "SP.DYN.TFRT.IN",
+        "NY.GDP.PCAP.CD",
+    ],
+    "world_bank_gender": [
+        "SG.GEN.PARL.ZS",
+        "HD.HCI.EYRS.FE",
+        "SP.ADO.TFRT",
+        "SH.STA.FGMS.ZS",
+        "SG.VAW.1549.ZS",
+        "SG.VAW.AFSX.ZS",
+        "SG.TIM.UWRK.MA",
+        "SG.TIM.UWRK.FE",
+        "SL.TLF.CACT.FE.ZS",
+        "SL.TLF.CACT.MA.ZS",
+        "SE.ENR.PRSC.FM.ZS",
+    ],
+    "world_bank_law": [
+        "SG.LAW.EQRM.WK",
+        "SG.LAW.NODC.HR",
+        "SG.GET.JOBS.EQ",
+        "SG.CNT.SIGN.EQ",
+        "SG.PEN.SXHR.EM",
+    ],
+}
+
+HDR_VARIABLES = [
+    "gii",
+    "mmr",
+    "abr",
+    "se_f",
+    "se_m",
+    "pr_f",
+    "pr_m",
+    "lfpr_f",
+    "lfpr_m",
+]
+
+UIS_INDICATORS = [
+    "EA.1T8.AG25T99.GPIA",
+    "EA.1T8.AG25T99.F",
+    "EA.1T8.AG25T99.M",
+    "EA.1T8.AG25T99",
+]
+
+MMR_PARAMETERS = [
+    "mmr",
+    "pm",
+    "maternal_deaths",
+    "births",
+    "hiv_related_indirect_mmr",
+    "hiv_related_indirect_maternal_deaths",
+    "hiv_related_indirect_percentage",
+    "lifetime_risk",
+    "lifetime_risk_1_in",
+]
+
+MMR_REGIONS = [
+    "world",
+    "Australia/New Zealand",
+    "Central and Southern Asia",
+    "Eastern and South-Eastern Asia",
+    "Europe and Northern America",
+    "Latin America and the Caribbean",
+    "Northern Africa and Western Asia",
+    "Oceania (excluding Australia and New Zealand)",
+    "Sub-Saharan Africa",
+    "High income",
+    "Lower middle income",
+    "Low income",
+    "Upper middle income",
+]
+
+# the region names of the poverty workbook have stray leading spaces
+POVERTY_REGIONS = [
+    "Australia and New Zealand",
+    " Central Asia and Southern Asia",
+    " Eastern and Southeast Asia",
+    " Europe and Northern America",
+    "Latin America and the Caribbean",
+    "Northern Africa and Western Asia",
+    " Oceania (excluding Australia and New Zealand)",
+    " Sub-Saharan Africa",
+    "World",
+]
+
+POVERTY_VARIABLES = {
+    "POVCOUNT": ("Poverty headcount, $1.90 threshold", "Million people"),
+    "POVCOUNT32": ("Poverty headcount, $3.20 threshold", "Million people"),
+    "POVCOUNT55": ("Poverty headcount, $5.50 threshold", "Million people"),
+    "POVCOUNTNPL": ("Poverty headcount, national poverty line", "Million people"),
+    "POVRATE": ("Poverty rate, $1.90 threshold", "Percent of population"),
+    "POVRATE32": ("Poverty rate, $3.20 threshold", "Percent of population"),
+    "POVRATE55": ("Poverty rate, $5.50 threshold", "Percent of population"),
+    "POVRATENPL": ("Poverty rate, national poverty line", "Percent of population"),
+}
+
+INCOME_LEVELS = [
+    "Low income",
+    "Lower middle income",
+    "Upper middle income",
+    "High income",
+]
+
+# respondents and countries of Afrobarometer round 7
+SURVEY_RESPONDENTS = 45_823
+SURVEY_COUNTRIES = 34
+
+# survey variables which are not used by the charts, so that reading only the
+# needed columns is part of what is measured
+SURVEY_FILLER_COLUMNS = 10
+
+
+def countries_at(copies: range) -> pd.DataFrame:
+    """Return the countries of the synthetic datasets
+
+    Args:
+        copies: numbers of the copies of the reference table to return. Copy 0
+            has the real ISO3 codes, the others synthetic codes with the same
+            names and continents, suffixed with their copy number.
+
+    Returns:
+        dataframe with the columns "iso_code", "name" and "continent"
+    """
+
+    reference = countries.reference_table()
+
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "iso_code": (
+                        reference.index if copy == 0 else reference.index + str(copy)
+                    ),
+                    "name": (
+                        reference.name_short
+                        if copy == 0
+                        else reference.name_short + f" {copy}"
+                    ).to_numpy(),
+                    "continent": reference.continent.to_numpy(),
+                }
+            )
+            for copy in copies
+        ],
+        ignore_index=True,
+    )
+
+
+def _copies(names, copies: range) -> list:
+    """Return copies of names. Copy 0 has the names themselves, the others
+    the names suffixed with their copy number"""
+
+    return [name if c == 0 else f"{name} {c}" for c in copies for name in names]
+
+
+def _panel(
+    rng: np.random.Generator,
+    indicators: list,
+    entities: list,
+    years: list,
+    missing: float = 0.0,
+) -> pd.DataFrame:
+    """Return every combination of indicator, entity and year, with random values
+
+    Args:
+        rng: random number generator
+        indicators: indicator codes
+        entities: entity codes
+        years: years
+        missing: share of values that are missing
+
+    Returns:
+        dataframe with the columns "indicator", "entity", "year" and "value",
+        sorted like the extracted files: by entity, indicator and year
+    """
+
+    index = pd.MultiIndex.from_product(
+        [entities, indicators, years], names=["entity", "indicator", "year"]
+    )
+    values = rng.random(len(index))
+    values[rng.random(len(index)) < missing] = np.nan
+
+    return index.to_frame(index=False).assign(value=values)
+
+
+def world_bank(name: str, copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic World Bank dataset, like world_bank_wdi.csv"""
+
+    places = countries_at(copies)
+    aggregates = zip(
+        _copies(WB_AGGREGATES, copies), _copies(WB_AGGREGATES.values(), copies)
+    )
+    names = dict(zip(places.iso_code, places.name)) | dict(aggregates)
+
+    return (
+        _panel(
+            rng,
+            WB_INDICATORS[name],
+            list(names),
+            list(range(1960, 2023)),
+            missing=0.3,
+        )
+        .assign(
+            # laws are yes (1) or no (0) questions
+            value=lambda d: (
+                d.value.round() if name == "world_bank_law" else d.value * 100
+            ),
+            date=lambda d: d.year.astype(str) + "-01-01",
+            iso_code=lambda d: d.entity,
+            indicator_code=lambda d: d.indicator,
+            indicator_name=lambda d: "name " + d.indicator,
+            entity_name=lambda d: d.entity.map(names),
+        )
+        .loc[
+            :,
+            [
+                "date",
+                "iso_code",
+                "indicator_code",
+                "value",
+                "indicator_name",
+                "entity_name",
+                "year",
+            ],
+        ]
+    )
+
+
+def hdr_gii(copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic version of hdr_gii.csv"""
+
+    places = countries_at(copies).set_index("iso_code")
+    hdicodes = pd.Series(
+        rng.choice(["Low", "Medium", "High", "Very high"], len(places)),
+        index=places.index,
+    )
+
+    return (
+        _panel(
+            rng,
+            HDR_VARIABLES,
+            places.index.tolist(),
+            list(range(1990, 2022)),
+            missing=0.1,
+        )
+        .assign(
+            iso3=lambda d: d.entity,
+            country=lambda d: d.entity.map(places.name),
+            hdicode=lambda d: d.entity.map(hdicodes),
+            region=lambda d: d.entity.map(places.continent),
+            variable=lambda d: d.indicator,
+        )
+        .loc[:, ["iso3", "country", "hdicode", "region", "variable", "year", "value"]]
+    )
+
+
+def uis(copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic version of uis.csv"""
+
+    places = countries_at(copies).set_index("iso_code")
+
+    return (
+        _panel(
+            rng,
+            UIS_INDICATORS,
+            places.index.tolist(),
+            list(range(2000, 2022)),
+            missing=0.7,
+        )
+        .dropna(subset=["value"])
+        .assign(
+            value=lambda d: d.value * 2,
+            MAGNITUDE=np.nan,
+            QUALIFIER=np.nan,
+        )
+        .rename(
+            columns={
+                "indicator": "INDICATOR_ID",
+                "entity": "COUNTRY_ID",
+                "year": "YEAR",
+                "value": "VALUE",
+            }
+        )
+        .assign(COUNTRY_NAME=lambda d: d.COUNTRY_ID.map(places.name))
+        .loc[
+            :,
+            [
+                "INDICATOR_ID",
+                "COUNTRY_ID",
+                "COUNTRY_NAME",
+                "YEAR",
+                "VALUE",
+                "MAGNITUDE",
+                "QUALIFIER",
+            ],
+        ]
+        .sort_values(["INDICATOR_ID", "COUNTRY_ID", "YEAR"], ignore_index=True)
+    )
+
+
+def _bounds(df: pd.DataFrame) -> pd.DataFrame:
+    """Add lower and upper bounds around the value of MMR estimates"""
+
+    return df.assign(
+        value=lambda d: d.value * 1000,
+        lower=lambda d: d.value * 0.8,
+        upper=lambda d: d.value * 1.2,
+    )
+
+
+def mmr_country(copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic version of mmr2020_country_estimates.csv"""
+
+    places = countries_at(copies).set_index("iso_code")
+
+    return (
+        _panel(rng, MMR_PARAMETERS, places.index.tolist(), list(range(2000, 2021)))
+        .pipe(_bounds)
+        .assign(
+            iso_code=lambda d: d.entity,
+            parameter=lambda d: d.indicator,
+            country=lambda d: d.entity.map(places.name),
+            continent=lambda d: d.entity.map(places.continent),
+        )
+        .loc[
+            :,
+            [
+                "iso_code",
+                "year",
+                "parameter",
+                "lower",
+                "value",
+                "upper",
+                "country",
+                "continent",
+            ],
+        ]
+    )
+
+
+def mmr_region(copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic version of mmr2020_region_estimates.csv"""
+
+    parameters = [
+        "maternal_deaths_summation_of_country_estimates"
+        if parameter == "maternal_deaths"
+        else parameter
+        for parameter in MMR_PARAMETERS
+    ]
+
+    return (
+        _panel(rng, parameters, _copies(MMR_REGIONS, copies), list(range(2000, 2021)))
+        .pipe(_bounds)
+        .rename(columns={"entity": "region", "indicator": "parameter"})
+        .loc[:, ["region", "year", "parameter", "lower", "value", "upper"]]
+    )
+
+
+def poverty_workbook(
+    copies: range, rng: np.random.Generator
+) -> dict[str, pd.DataFrame]:
+    """Return synthetic sheets of the UN Women / Pardee poverty workbook
+
+    Args:
+        copies: copies of the countries and regions to include, see
+            `countries_at`
+        rng: random number generator
+
+    Returns:
+        dictionary with the keys of extract_poverty.SHEETS: the variables
+        sheet, and wide sheets of regional and country data with a column
+        per year
+    """
+
+    places = countries_at(copies)
+    years = list(range(2017, 2031))
+
+    variables = pd.DataFrame(
+        [(code, *details) for code, details in POVERTY_VARIABLES.items()],
+        columns=["Variable", "Description", "Unit"],
+    )
+
+    def wide(entity_column: str, entities: list) -> pd.DataFrame:
+        index = pd.MultiIndex.from_product(
+            [["Female", "Male"], list(POVERTY_VARIABLES), entities],
+            names=["Sex", "Variable", entity_column],
+        )
+        values = pd.DataFrame(
+            rng.random((len(index), len(years))) * 100, index=index, columns=years
+        )
+
+        return values.reset_index().assign(Age="All", Scenario="Baseline")
+
+    return {
+        "variables": variables,
+        "regional_data": wide("Region", _copies(POVERTY_REGIONS, copies)),
+        "country_data": wide("ISO Code", places.iso_code.tolist()),
+    }
+
+
+def poverty(copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic version of unwomen_pardee_poverty.csv, built from
+    synthetic workbook sheets by the steps of the poverty extraction"""
+
+    from scripts.extraction_tools import extract_poverty
+
+    sheets = poverty_workbook(copies, rng)
+    mapper = extract_poverty.get_mapper(sheets["variables"])
+
+    return pd.concat(
+        [
+            extract_poverty.clean_region_data(sheets["regional_data"], mapper),
+            extract_poverty.clean_country_data(sheets["country_data"], mapper),
+        ],
+        ignore_index=True,
+    )
+
+
+def income_levels(copies: range, rng: np.random.Generator) -> pd.DataFrame:
+    """Return a synthetic version of income_levels.csv, with two snapshots"""
+
+    codes = countries_at(copies).iso_code
+
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "iso_code": codes,
+                    "income_level": rng.choice(INCOME_LEVELS, len(codes)),
+                    "year": year,
+                }
+            )
+            for year in (2022, 2023)
+        ],
+        ignore_index=True,
+    )
+
+
+def afrobarometer(copies: range, rng: np.random.Generator) -> tuple[pd.DataFrame, dict]:
+    """Return a synthetic Afrobarometer survey and its value labels
+
+    Args:
+        copies: copies of the respondents to include. Each copy has as many
+            respondents as round 7 of the survey.
+        rng: random number generator
+
+    Returns:
+        dataframe of survey codes, as floats like in the .sav file, and a
+        dictionary with the labels of the codes of each variable
+    """
+
+    respondents = SURVEY_RESPONDENTS * len(copies)
+
+    labels = {
+        "COUNTRY": {
+            float(code): f"Country {code}" for code in range(1, SURVEY_COUNTRIES + 1)
+        },
+        "Q101": {1.0: "Male", 2.0: "Female", -1.0: "Missing"},
+        "Q16": {
+            1.0: "Agree very strongly with 1",
+            2.0: "Agree with 1",
+            3.0: "Agree with 2",
+            4.0: "Agree very strongly with 2",
+            5.0: "Agree with neither",
+            8.0: "Refused",
+            9.0: "Don't know",
+            -1.0: "Missing",
+        },
+    }
+
+    df = pd.DataFrame(
+        {
+            "RESPNO": [f"R{i}" for i in range(respondents)],
+            **{
+                column: rng.choice(list(codes), respondents)
+                for column, codes in labels.items()
+            },
+            "withinwt": rng.uniform(0.5, 1.5, respondents),
+            **{
+                f"Q{i}": rng.integers(0, 10, respondents).astype(float)
+                for i in range(1, SURVEY_FILLER_COLUMNS + 1)
+            },
+        }
+    )
+
+    return df, labels
+
+
+def _version() -> str:
+    """Return a hash of the source of this module, to key generated data on"""
+
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:12]
+
+
+# generators of the csv files, by file name
+TABLES = {
+    "world_bank_wdi.csv": lambda copies, rng: world_bank("world_bank_wdi", copies, rng),
+    "world_bank_gender.csv": lambda copies, rng: world_bank(
+        "world_bank_gender", copies, rng
+    ),
+    "world_bank_law.csv": lambda copies, rng: world_bank("world_bank_law", copies, rng),
+    "hdr_gii.csv": hdr_gii,
+    "uis.csv": uis,
+    "mmr2020_country_estimates.csv": mmr_country,
+    "mmr2020_region_estimates.csv": mmr_region,
+    "unwomen_pardee_poverty.csv": poverty,
+    "income_levels.csv": income_levels,
+}
+
+
+def write(folder: Path, scale: int) -> None:
+    """Write every synthetic dataset to a folder, with the raw file names
+
+    The csv files are written one copy of the entities at a time, so that
+    large scales do not have to fit in memory.
+
+    Args:
+        folder: folder to write the files to
+        scale: scale of the datasets
+    """
+
+    import pyreadstat
+
+    rng = np.random.default_rng(SEED)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    for file, generate in TABLES.items():
+        for copy in range(scale):
+            generate(range(copy, copy + 1), rng).to_csv(
+                folder / file,
+                mode="w" if copy == 0 else "a",
+                header=copy == 0,
+                index=False,
+            )
+
+    survey, labels = afrobarometer(range(scale), rng)
+    pyreadstat.write_sav(
+        survey, folder / "afrobarometer.sav", variable_value_labels=labels
+    )
+
+
+def raw_data(scale: int) -> Path:
+    """Return the folder of synthetic raw data at a scale, generating it if needed
+
+    Args:
+        scale: scale of the datasets, e.g. 10 for ten times as many entities
+            as the real data
+
+    Returns:
+        path to a folder laid out like raw_data
+    """
+
+    folder = PATHS.cache / "synthetic" / f"{scale}x-{_version()}"
+    done = folder / ".complete"
+
+    if not done.exists():
+        logger.info(f"Generating synthetic data at {scale}x scale in {folder}")
+        write(folder, scale)
+        done.touch()
+
+    return folder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic raw data")
+    parser.add_argument(
+        "--scales",
+        type=int,
+        nargs="+",
+        default=list(SCALES),
+        help="scales to generate (default: 1 10 100)",
+    )
+    for scale in parser.parse_args().scales:
+        raw_data(scale)
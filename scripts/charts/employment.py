@@ -1,14 +1,11 @@
 """Employment Charts"""
 
 import pandas as pd
-import country_converter as coco
-import numpy as np
 
 from scripts.config import PATHS
+from scripts import common, countries, datasets
 from scripts.logger import logger
 
-WB_GENDER = pd.read_csv(f"{PATHS.raw_data}/world_bank_gender.csv")
-
 
 def chart_unpaid_work():
     """ """
@@ -16,14 +13,12 @@ def chart_unpaid_work():
     mapping = {"SG.TIM.UWRK.MA": "male", "SG.TIM.UWRK.FE": "female"}
 
     df = (
-        WB_GENDER.loc[lambda d: d.indicator_code.isin(mapping)]
-        .dropna(subset=["value"])
-        .assign(year=lambda d: pd.to_datetime(d["date"]).dt.year)
-        .loc[lambda d: d.groupby(["indicator_code", "iso_code"])["year"].idxmax()]
+        datasets.store("world_bank_gender")
+        .get(indicator=list(mapping))
+        .assign(year=datasets.years)
+        .pipe(common.latest_value, "value", ["indicator_code", "iso_code"], "year")
         .assign(
-            country=lambda d: coco.convert(
-                d.iso_code, to="name_short", not_found=np.nan
-            ),
+            country=lambda d: countries.convert(d.iso_code, to="name_short"),
             sex=lambda d: d.indicator_code.map(mapping),
         )
         .dropna(subset=["country"])
@@ -50,12 +45,11 @@ def get_labor_force(regions: list) -> pd.DataFrame:
     mapping = {"SL.TLF.CACT.FE.ZS": "female", "SL.TLF.CACT.MA.ZS": "male"}
 
     return (
-        WB_GENDER.loc[
-            lambda d: (d.indicator_code.isin(mapping)) & (d.iso_code.isin(regions))
-        ]
+        datasets.store("world_bank_gender")
+        .get(indicator=list(mapping), entities=regions)
         .dropna(subset="value")
         .assign(
-            year=lambda d: pd.to_datetime(d.date).dt.year,
+            year=datasets.years,
             sex=lambda d: d.indicator_code.map(mapping),
         )
         .pivot(index=["year", "entity_name"], columns="sex", values="value")
@@ -2,21 +2,11 @@
 
 import pandas as pd
 import numpy as np
-import country_converter as coco
-from bblocks.dataframe_tools import add
 
 from scripts.config import PATHS
-from scripts import common
+from scripts import common, countries, datasets
 from scripts.logger import logger
 
-GII = pd.read_csv(f"{PATHS.raw_data}/hdr_gii.csv")
-
-
-def _keep_only_indicator(df: pd.DataFrame, indicator: str, col: str = "indicator"):
-    """Helper function to filter dataframe keeping only selected indicator"""
-
-    return df.loc[df[col] == indicator].reset_index(drop=True)
-
 
 def get_latest_for_countries(variable: str) -> pd.DataFrame:
     """Get a dataframe with latest values for countries for a given variable
@@ -27,10 +17,10 @@ def get_latest_for_countries(variable: str) -> pd.DataFrame:
     """
 
     return (
-        GII.pipe(_keep_only_indicator, variable, "variable")
-        .dropna(subset=["hdicode", "value"])
-        .loc[lambda d: d.groupby("country")["year"].idxmax()]
-        .reset_index(drop=True)
+        datasets.store("hdr_gii")
+        .get(indicator=variable)
+        .dropna(subset=["hdicode"])
+        .pipe(common.latest_value, "value", "country", "year")
     )
 
 
@@ -45,9 +35,11 @@ def chart_gii_explorer_latest() -> None:
         .loc[:, ["iso3", "country", "value", "year"]]
         .assign(
             female_pop=lambda d: d.iso3.map(common.female_population()),
-            continent=lambda d: coco.convert(d.iso3, to="continent"),
+            continent=lambda d: countries.convert(
+                d.iso3, to="continent", not_found="not found"
+            ),
         )
-        .pipe(add.add_income_level_column, id_column="iso3", id_type="iso3")
+        .pipe(countries.add_income_level, "iso3")
         # highlight categories for scrolly
         .assign(
             africa_highlight=lambda d: d.continent.where(
@@ -72,88 +64,117 @@ def chart_gii_explorer_latest() -> None:
     logger.debug("Updated chart hdr_gii_bubble_latest")
 
 
-def _histogram_chart(df: pd.DataFrame, grouping: str) -> pd.DataFrame:
-    """Create a curved histogram from a dataframe with 10 bins from 0-1
+# bins of the GII histogram, and the label and x value of each bin
+GII_BINS = [0, 0.0001, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1]
+GII_BIN_LABELS = {
+    "0": 0,
+    "0-0.1": 0.05,
+    "0.1-0.2": 0.15,
+    "0.2-0.3": 0.25,
+    "0.3-0.4": 0.35,
+    "0.4-0.5": 0.45,
+    "0.5-0.6": 0.55,
+    "0.6-0.7": 0.65,
+    "0.7-0.8": 0.75,
+    "0.8-0.9": 0.85,
+    "0.9-1": 0.95,
+}
+
+
+def _grouped_histogram(
+    df: pd.DataFrame,
+    value: str,
+    by: str,
+    groups: dict[str, pd.Series],
+    bins: list,
+    labels: dict,
+) -> pd.DataFrame:
+    """Count values in bins for several groups of rows, in a single pass
+
+    Values are binned once with np.digitize, and the counts of every group,
+    `by` value and bin come out of a single np.bincount.
 
     Args:
-        df: dataframe with values to bin
-        grouping: column to group by
+        df: dataframe with the values to bin
+        value: column with the values to bin
+        by: column whose values are counted separately, e.g. "year"
+        groups: name of each group: boolean mask of its rows in `df`. A row can
+            belong to several groups.
+        bins: bin edges. Bins include their upper edge, and the first bin also
+            includes its lower edge, as with pd.cut(include_lowest=True).
+            Values outside the edges are not counted.
+        labels: label of each bin: x value used to plot it
 
     Returns:
-        dataframe with binned values and counts
-
-
+        dataframe indexed by x value, bin label and `by` value, with a column
+        of counts for each group. A group only has rows for the `by` values
+        of its rows.
     """
 
-    bins = [0, 0.0001, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1]
-    labels = {
-        "0": 0,
-        "0-0.1": 0.05,
-        "0.1-0.2": 0.15,
-        "0.2-0.3": 0.25,
-        "0.3-0.4": 0.35,
-        "0.4-0.5": 0.45,
-        "0.5-0.6": 0.55,
-        "0.6-0.7": 0.65,
-        "0.7-0.8": 0.75,
-        "0.8-0.9": 0.85,
-        "0.9-1": 0.95,
-    }
-
-    return (
-        df.assign(
-            binned=lambda d: pd.cut(
-                d.value, bins=bins, labels=labels.keys(), include_lowest=True
-            )
+    values = df[value].to_numpy(dtype="float64")
+    edges = np.asarray(bins, dtype="float64")
+
+    bin_codes = np.clip(np.digitize(values, edges, right=True) - 1, 0, None)
+    by_codes, by_values = pd.factorize(df[by], sort=True)
+
+    membership = np.vstack([np.asarray(mask, dtype=bool) for mask in groups.values()])
+    membership &= by_codes >= 0
+
+    n_groups, n_by, n_bins = len(groups), len(by_values), len(edges) - 1
+
+    # `by` values with rows in each group, even if none of their values is binned
+    present = np.zeros((n_groups, n_by), dtype=bool)
+    group_codes, rows = np.nonzero(membership)
+    present[group_codes, by_codes[rows]] = True
+
+    valid = (values >= edges[0]) & (values <= edges[-1])
+    group_codes, rows = np.nonzero(membership & valid)
+    counts = np.bincount(
+        (group_codes * n_by + by_codes[rows]) * n_bins + bin_codes[rows],
+        minlength=n_groups * n_by * n_bins,
+    ).reshape(n_groups, n_by, n_bins)
+
+    frames = []
+    for name, group_present, group_counts in zip(groups, present, counts):
+        n_present = int(group_present.sum())
+        frames.append(
+            pd.DataFrame(
+                {
+                    "x_values": np.tile(list(labels.values()), n_present),
+                    "binned": np.tile(list(labels), n_present),
+                    by: np.repeat(by_values[group_present], n_bins),
+                    name: group_counts[group_present].ravel(),
+                }
+            ).set_index(["x_values", "binned", by])
         )
-        .groupby(["binned", grouping])
-        .size()
-        .reset_index(name="counts")
-        .assign(x_values=lambda d: d.binned.map(labels))
-        .pivot(index=["x_values", "binned"], columns=grouping, values="counts")
-        .reset_index()
-    )
-
 
-def chart_gii_ridgeline():
-    """Create a curved histogram for GII by year for world and Africa"""
+    return pd.concat(frames, axis=1)
 
-    world = (
-        GII.pipe(_keep_only_indicator, "gii", "variable")
-        .pipe(_histogram_chart, grouping="year")
-        .melt(id_vars=["x_values", "binned"], var_name="year", value_name="World")
-        .set_index(["x_values", "binned", "year"])
-    )
 
-    africa = (
-        GII.pipe(_keep_only_indicator, "gii", "variable")
-        .assign(continent=lambda d: coco.convert(d.iso3, to="continent"))
-        .loc[lambda d: d.continent == "Africa"]
-        .pipe(_histogram_chart, grouping="year")
-        .melt(id_vars=["x_values", "binned"], var_name="year", value_name="Africa")
-        .set_index(["x_values", "binned", "year"])
-    )
+def chart_gii_ridgeline():
+    """Create a curved histogram for GII by year for world, Africa and
+    low and high income countries"""
 
-    lic = (
-        GII.pipe(_keep_only_indicator, "gii", "variable")
-        .pipe(add.add_income_level_column, id_column="iso3", id_type="iso3")
-        .loc[lambda d: d.income_level == "Low income"]
-        .pipe(_histogram_chart, grouping="year")
-        .melt(id_vars=["x_values", "binned"], var_name="year", value_name="Low income")
-        .set_index(["x_values", "binned", "year"])
+    gii = (
+        datasets.store("hdr_gii")
+        .get(indicator="gii")
+        .assign(
+            continent=lambda d: countries.convert(
+                d.iso3, to="continent", not_found="not found"
+            )
+        )
+        .pipe(countries.add_income_level, "iso3")
     )
 
-    hic = (
-        GII.pipe(_keep_only_indicator, "gii", "variable")
-        .pipe(add.add_income_level_column, id_column="iso3", id_type="iso3")
-        .loc[lambda d: d.income_level == "High income"]
-        .pipe(_histogram_chart, grouping="year")
-        .melt(id_vars=["x_values", "binned"], var_name="year", value_name="High income")
-        .set_index(["x_values", "binned", "year"])
-    )
+    groups = {
+        "Africa": gii.continent == "Africa",
+        "Low income": gii.income_level == "Low income",
+        "High income": gii.income_level == "High income",
+        "World": pd.Series(True, index=gii.index),
+    }
 
     (
-        pd.concat([africa, lic, hic, world], axis=1)
+        _grouped_histogram(gii, "value", "year", groups, GII_BINS, GII_BIN_LABELS)
         .reset_index()
         .loc[lambda d: d.year.isin([1990, 2000, 2010, d.year.max()])]
         .to_csv(f"{PATHS.output}/hdr_gii_histogram_ridge.csv", index=False)
@@ -2,20 +2,9 @@
 
 import pandas as pd
 from scripts.logger import logger
-import country_converter as coco
-import numpy as np
-from bblocks.dataframe_tools import add
-import pyreadstat
 
 from scripts.config import PATHS
-from scripts import common
-
-LAWS = pd.read_csv(f"{PATHS.raw_data}/world_bank_law.csv")
-WB_GENDER = pd.read_csv(f"{PATHS.raw_data}/world_bank_gender.csv")
-
-afrobarometer_data, afrobarometer_meta = pyreadstat.read_sav(
-    f"{PATHS.raw_data}/afrobarometer.sav"
-)
+from scripts import common, countries, datasets, surveys
 
 laws = [
     "SG.LAW.EQRM.WK",
@@ -40,10 +29,11 @@ def make_marimekko(indicators: list) -> pd.DataFrame:
     name_dict = {-1: "no", 1: "yes"}
 
     df = (
-        LAWS.loc[lambda d: d.indicator_code.isin(indicators)]
+        datasets.store("world_bank_law")
+        .get(indicator=indicators)
         .dropna(subset="value")
         .assign(
-            year=lambda d: pd.to_datetime(d["date"]).dt.year,
+            year=datasets.years,
             value=lambda d: d.value.map(value_dict),
             value_label=lambda d: d.value.map(name_dict),
         )
@@ -88,19 +78,18 @@ def chart_parliament_participation_beeswarm() -> None:
     """Create a beeswarm chart showing women's participation in parliament"""
 
     (
-        WB_GENDER[lambda d: d.indicator_code == "SG.GEN.PARL.ZS"]
-        .assign(year=lambda d: pd.to_datetime(d.date).dt.year)
+        datasets.store("world_bank_gender")
+        .get(indicator="SG.GEN.PARL.ZS")
+        .assign(year=datasets.years)
         .dropna(subset="value")
         .pipe(common.latest_value, "value", "iso_code", "year")
         .pipe(common.only_countries, "iso_code")
         .assign(
-            continent=lambda d: coco.convert(
-                d.iso_code, to="continent", not_found=np.nan
-            ),
+            continent=lambda d: countries.convert(d.iso_code, to="continent"),
             # female_pop=lambda d: d.iso_code.map(common.female_population()),
             # gdppc = lambda d: d.iso_code.map(common.gdp_per_capita()),
         )
-        .pipe(add.add_income_level_column, id_column="iso_code", id_type="iso3")
+        .pipe(countries.add_income_level, "iso_code")
         .loc[:, ["continent", "value", "income_level", "entity_name", "year"]]
         .to_csv(f"{PATHS.output}/parliament_participation_beeswarm.csv", index=False)
     )
@@ -111,77 +100,33 @@ def chart_afrobarometer_sentiment() -> None:
     """Create a chart showing sentiment towards gender equality in politics
     from Afrobarometer data"""
 
+    # Q16: statement 1 is "Men make better political leaders than women",
+    # statement 2 "Women should have the same chance of being elected as men"
+    question = surveys.Question(
+        "Q16",
+        responses={
+            "Agree very strongly with 1": "strongly disagree",
+            "Agree very strongly with 2": "strongly agree",
+            "Agree with 1": "disagree",
+            "Agree with 2": "agree",
+        },
+        negative=("strongly disagree", "disagree"),
+    )
+
     (
-        afrobarometer_data[["COUNTRY", "Q101", "Q16"]]
-        .assign(
-            gender=lambda d: d.Q101.map(
-                afrobarometer_meta.value_labels[
-                    afrobarometer_meta.variable_to_label["Q101"]
-                ]
-            ),
-            country=lambda d: d.COUNTRY.map(
-                afrobarometer_meta.value_labels[
-                    afrobarometer_meta.variable_to_label["COUNTRY"]
-                ]
-            ),
-            response=lambda d: d.Q16.map(
-                afrobarometer_meta.value_labels[
-                    afrobarometer_meta.variable_to_label["Q16"]
-                ]
-            ),
+        surveys.crosstab(
+            datasets.afrobarometer(("COUNTRY", "Q101", "Q16", "withinwt")),
+            [question],
+            by="COUNTRY",
+            breakdown="Q101",
+            groups={"Female": "female", "Male": "male"},
+            labels=datasets.afrobarometer_labels,
+            weight="withinwt",
         )
-        .loc[
-            lambda d: d.response.isin(
-                [
-                    "Agree very strongly with 2",
-                    "Agree with 2",
-                    "Agree very strongly with 1",
-                    "Agree with 1",
-                ]
-            ),
-            ["country", "gender", "response"],
-        ]
-        # aggregate and get totals
-        .groupby(["country", "gender", "response"])
-        .size()
-        .reset_index(name="response_count")
-        # pivot for gender
-        .pivot(index=["country", "response"], columns="gender", values="response_count")
-        .fillna(0)
-        .assign(all=lambda d: d.sum(axis=1))
-        .drop(columns="Missing")  # remove values from missing gender var
-        # calculate proportions
-        .assign(
-            female=lambda d: (d.Female / d.groupby(level=0)["Female"].transform("sum"))
-            * 100,
-            male=lambda d: (d.Male / d.groupby(level=0)["Male"].transform("sum")) * 100,
-            total=lambda d: (d["all"] / d.groupby(level=0)["all"].transform("sum"))
-            * 100,
-        )
-        .loc[:, ["female", "male", "total"]]
-        .rename(columns={"total": "all"})
-        .reset_index()
-        # melt and pivot so that responses are columns
-        .melt(id_vars=["country", "response"], value_name="proportion")
-        .pivot(index=["country", "gender"], columns="response", values="proportion")
+        .rename(columns={"COUNTRY": "country", "Q101": "gender"})
+        .pivot(index=["country", "gender"], columns="response", values="share")
+        .loc[:, list(question.responses.values())]
         .reset_index()
-        # make values negative for disagree responses
-        .assign(
-            **{
-                "Agree very strongly with 1": lambda d: d["Agree very strongly with 1"]
-                * -1,
-                "Agree with 1": lambda d: d["Agree with 1"] * -1,
-            }
-        )
-        # rename responses
-        .rename(
-            columns={
-                "Agree very strongly with 1": "strongly disagree",
-                "Agree very strongly with 2": "strongly agree",
-                "Agree with 1": "disagree",
-                "Agree with 2": "agree",
-            }
-        )
         .to_csv(f"{PATHS.output}/afrobarometer_sentiment.csv", index=False)
     )
 
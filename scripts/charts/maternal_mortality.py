@@ -3,22 +3,28 @@
 import pandas as pd
 
 from scripts.config import PATHS
+from scripts import common, datasets
 from scripts.logger import logger
 
-COUNTRIES = pd.read_csv(f"{PATHS.raw_data}/mmr2020_country_estimates.csv")
-REGIONS = pd.read_csv(f"{PATHS.raw_data}/mmr2020_region_estimates.csv")
+
+@common.memoize(source=lambda: datasets.raw_path("mmr2020_region_estimates"))
+def maternal_deaths_2020() -> pd.DataFrame:
+    """Return maternal deaths in 2020 for every region
+
+    The slice is shared by the pictogram charts, which must not modify it.
+    """
+
+    return datasets.store("mmr2020_region_estimates").get(
+        indicator="maternal_deaths_summation_of_country_estimates", years=2020
+    )
 
 
 def chart_pictogram_world() -> None:
     """Create picotgram of total maternal deaths for world in 2020"""
 
     (
-        REGIONS.loc[
-            lambda d: (d.parameter == "maternal_deaths_summation_of_country_estimates")
-            & (d.region == "world")
-            & (d.year == 2020),
-            ["region", "year", "value"],
-        ]
+        maternal_deaths_2020()
+        .loc[lambda d: d.region == "world", ["region", "year", "value"]]
         .assign(
             value=lambda d: d.value.round(0),
             region=lambda d: d.region.map({"world": "World"}),
@@ -31,11 +37,8 @@ def chart_pictogram_SSA_rest_of_world() -> None:
     """Create pictogram of total maternal deaths for SSA and rest of the world in 2020"""
 
     (
-        REGIONS.loc[
-            lambda d: (d.parameter == "maternal_deaths_summation_of_country_estimates")
-            & (d.region.isin(["world", "Sub-Saharan Africa"]))
-            & (d.year == 2020)
-        ]
+        maternal_deaths_2020()
+        .loc[lambda d: d.region.isin(["world", "Sub-Saharan Africa"])]
         .pivot(index="year", columns="region", values="value")
         .assign(diff=lambda d: d["world"] - d["Sub-Saharan Africa"])
         .rename(columns={"diff": "Rest of the world"})
@@ -52,11 +55,8 @@ def chart_pictogram_low_middle_income() -> None:
     income countries and rest of the world in 2020"""
 
     (
-        REGIONS.loc[
-            lambda d: (d.parameter == "maternal_deaths_summation_of_country_estimates")
-            & (d.region.isin(["world", "Low income", "Lower middle income"]))
-            & (d.year == 2020)
-        ]
+        maternal_deaths_2020()
+        .loc[lambda d: d.region.isin(["world", "Low income", "Lower middle income"])]
         .pivot(index="year", columns="region", values="value")
         .assign(
             low=lambda d: d["Low income"] + d["Lower middle income"],
@@ -122,20 +122,24 @@ def chart_line_change_in_mmr() -> None:
     ]
 
     countries_df = (
-        COUNTRIES.loc[
-            lambda d: (d.parameter == "mmr") & (d.country.isin(country_list)),
-            ["country", "year", "value", "lower", "upper"],
-        ]
+        datasets.store("mmr2020_country_estimates")
+        .get(
+            indicator="mmr",
+            columns=["country", "year", "value", "lower", "upper"],
+            country=country_list,
+        )
         .pipe(calculate_pct_change, 2000, "country", "value")
         .pivot(index="year", columns="country", values="decrease")
         .reset_index()
     )
 
     df_regions = (
-        REGIONS.loc[
-            lambda d: (d.parameter == "mmr") & (d.region.isin(region_list)),
-            ["region", "year", "value", "lower", "upper"],
-        ]
+        datasets.store("mmr2020_region_estimates")
+        .get(
+            indicator="mmr",
+            entities=region_list,
+            columns=["region", "year", "value", "lower", "upper"],
+        )
         .pipe(calculate_pct_change, 2000, "region", "value")
         .pivot(index="year", columns="region", values="decrease")
         .reset_index()
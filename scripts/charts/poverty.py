@@ -1,23 +1,20 @@
 """Poverty charts"""
 
-import pandas as pd
-
 from scripts.config import PATHS
+from scripts import datasets
 from scripts.logger import logger
 
-POVERTY = pd.read_csv(f"{PATHS.raw_data}/unwomen_pardee_poverty.csv")
-
 
 def chart_poverty_change_line() -> None:
     """Create poverty chart showing change in poverty compared to 2019"""
 
-    df = POVERTY.loc[
-        (POVERTY.variable_code == "POVCOUNT")
-        & (POVERTY.region_name.isin([" Sub-Saharan Africa", "World"]))
-        & (POVERTY.sex == "Female")
-        & (POVERTY.year >= 2019),
-        ["region_name", "year", "value"],
-    ].reset_index(drop=True)
+    df = datasets.store("unwomen_pardee_poverty").get(
+        indicator="POVCOUNT",
+        entities=[" Sub-Saharan Africa", "World"],
+        years=slice(2019, None),
+        columns=["region_name", "year", "value"],
+        sex="Female",
+    )
 
     df = (
         df.merge(
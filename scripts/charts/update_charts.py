@@ -1,5 +1,33 @@
-"""Pipeline to update charts."""
+"""Pipeline to update charts.
 
+Each chart declares the raw datasets and shared lookups it needs, and any
+charts that must be built before it. Shared lookups and dataset stores are
+computed once in the main process, and charts are then built in a pool of
+worker processes which inherit them. Independent charts run in parallel.
+
+A manifest records a fingerprint of the inputs of each chart: its raw files,
+the lookups it uses, the source code of its module and of the modules shared
+by all charts, and the fingerprints of the charts it depends on. Charts whose
+fingerprint has not changed since the last build are skipped.
+
+Usage:
+    python scripts/charts/update_charts.py [--jobs N] [--force] [chart ...]
+"""
+
+import argparse
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import time
+from functools import cache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from graphlib import TopologicalSorter
+from typing import Callable, NamedTuple
+
+from scripts import common, countries, datasets, instrumentation, surveys, telemetry
+from scripts.config import PATHS
 from scripts.charts import (
     education,
     hdr,
@@ -11,23 +39,395 @@ from scripts.charts import (
 from scripts.logger import logger
 
 
-if __name__ == "__main__":
-    """Update charts"""
+MANIFEST = PATHS.logs / "charts_manifest.json"
+
+# modules and files used by every chart module, so a change to any of them
+# can change the output of every chart
+SHARED_SOURCES = [
+    inspect.getsourcefile(common),
+    inspect.getsourcefile(countries),
+    inspect.getsourcefile(datasets),
+    inspect.getsourcefile(surveys),
+    countries.REFERENCE_FILE,
+]
+
+
+class Chart(NamedTuple):
+    """A chart function and the inputs it needs
+
+    The name of a chart is the name of the csv file it writes to the output folder.
+    """
+
+    name: str
+    func: Callable[[], None]
+    datasets: tuple[str, ...] = ()
+    lookups: tuple[str, ...] = ()
+    after: tuple[str, ...] = ()
+
+
+# lookups shared by several charts, computed once before charts are built
+LOOKUPS = {
+    "female_population": common.female_population,
+    "gdp_per_capita": common.gdp_per_capita,
+}
+
+CHARTS = [
+    Chart(
+        "education_attainment_scatter",
+        education.chart_scatter_attainment,
+        datasets=("uis",),
+        lookups=("gdp_per_capita",),
+    ),
+    Chart(
+        "hdr_gii_bubble_latest",
+        hdr.chart_gii_explorer_latest,
+        datasets=("hdr_gii", "income_levels"),
+        lookups=("female_population",),
+    ),
+    Chart(
+        "hdr_gii_histogram_ridge",
+        hdr.chart_gii_ridgeline,
+        datasets=("hdr_gii", "income_levels"),
+    ),
+    Chart("unpaid_work", employment.chart_unpaid_work, datasets=("world_bank_gender",)),
+    Chart(
+        "labor_force_world",
+        employment.chart_labor_force_world,
+        datasets=("world_bank_gender",),
+    ),
+    Chart(
+        "labor_force_income",
+        employment.chart_labor_force_income,
+        datasets=("world_bank_gender",),
+    ),
+    Chart(
+        "laws_marimekko",
+        legislation.chart_laws_marimekko,
+        datasets=("world_bank_law",),
+        lookups=("female_population",),
+    ),
+    Chart(
+        "parliament_participation_beeswarm",
+        legislation.chart_parliament_participation_beeswarm,
+        datasets=("world_bank_gender", "income_levels"),
+    ),
+    Chart(
+        "mmr_line_change_in_mmr",
+        maternal_mortality.chart_line_change_in_mmr,
+        datasets=("mmr2020_country_estimates", "mmr2020_region_estimates"),
+    ),
+    Chart(
+        "poverty_change_line",
+        poverty.chart_poverty_change_line,
+        datasets=("unwomen_pardee_poverty",),
+    ),
+]
+
+
+def _file_hash(path: os.PathLike) -> str:
+    """Return the sha256 of the content of a file
+
+    Raises:
+        FileNotFoundError: if the file does not exist
+    """
+
+    stat = os.stat(path)
+
+    return _content_hash(os.fspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+@cache
+def _content_hash(path: str, mtime_ns: int, size: int) -> str:
+    """Hash a file, once per version of the file: a file rewritten during
+    the run is hashed again"""
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+
+    return sha256.hexdigest()
+
+
+def _lookup_hash(name: str) -> str:
+    """Return the sha256 of the value of a shared lookup"""
+
+    value = json.dumps(sorted(LOOKUPS[name]().items()), default=str)
+
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def fingerprints(charts: list[Chart]) -> dict[str, str | None]:
+    """Compute a fingerprint of the inputs of each chart
+
+    Args:
+        charts: charts to fingerprint. Charts they depend on must be included.
+
+    Returns:
+        dictionary with the fingerprint of each chart, None for the charts
+        with a missing input file, which are always stale
+    """
+
+    by_name = {chart.name: chart for chart in charts}
+    order = TopologicalSorter({c.name: c.after for c in charts}).static_order()
+
+    shared = {os.path.basename(path): _file_hash(path) for path in SHARED_SOURCES}
+
+    result = {}
+    for name in order:
+        chart = by_name[name]
+        try:
+            inputs = {
+                "datasets": {
+                    d: _file_hash(datasets.raw_path(d)) for d in chart.datasets
+                },
+                "lookups": {lookup: _lookup_hash(lookup) for lookup in chart.lookups},
+                "source": _file_hash(inspect.getsourcefile(chart.func)),
+                "shared": shared,
+                "after": {a: result[a] for a in chart.after},
+            }
+        except FileNotFoundError as error:
+            logger.warning(f"{name} is missing its input {error.filename}")
+            result[name] = None
+            continue
+
+        result[name] = hashlib.sha256(
+            json.dumps(inputs, sort_keys=True).encode()
+        ).hexdigest()
+
+    return result
+
+
+def _read_manifest() -> dict[str, str]:
+    if not MANIFEST.exists():
+        return {}
+
+    with open(MANIFEST) as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest: dict[str, str]) -> None:
+    with datasets.atomic_path(MANIFEST) as path:
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def stale_charts(charts: list[Chart], current: dict[str, str | None]) -> list[Chart]:
+    """Return the charts whose inputs changed since they were last built,
+    or whose output file or input files are missing"""
+
+    manifest = _read_manifest()
+
+    return [
+        chart
+        for chart in charts
+        if current[chart.name] is None
+        or manifest.get(chart.name) != current[chart.name]
+        or not (PATHS.output / f"{chart.name}.csv").exists()
+    ]
 
-    education.chart_scatter_attainment()
 
-    hdr.chart_gii_explorer_latest()
-    hdr.chart_gii_ridgeline()
+def _build(chart: Chart) -> float:
+    """Build a chart and return the time it took, in seconds"""
 
-    employment.chart_unpaid_work()
-    employment.chart_labor_force_world()
-    employment.chart_labor_force_income()
+    start = time.perf_counter()
+    with instrumentation.profile(chart.name):
+        chart.func()
 
-    legislation.chart_laws_marimekko()
-    legislation.chart_parliament_participation_beeswarm()
+    return time.perf_counter() - start
 
-    maternal_mortality.chart_line_change_in_mmr()
 
-    poverty.chart_poverty_change_line()
+def _select(charts: list[Chart], names: list[str] | None) -> list[Chart]:
+    """Keep only the named charts and the charts they depend on"""
+
+    if not names:
+        return charts
+
+    by_name = {chart.name: chart for chart in charts}
+    unknown = set(names) - set(by_name)
+    if unknown:
+        raise ValueError(f"Unknown charts: {sorted(unknown)}")
+
+    selected, pending = set(), list(names)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(by_name[name].after)
+
+    return [chart for chart in charts if chart.name in selected]
+
+
+def _pool(jobs: int) -> ProcessPoolExecutor:
+    """Create a process pool. Workers are forked where possible, so they
+    inherit the lookups and datasets already loaded in the main process"""
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("fork"))
+
+    return ProcessPoolExecutor(jobs)
+
+
+def build_charts(charts: list[Chart], jobs: int = 1) -> dict[str, float]:
+    """Build charts, running independent charts in parallel
+
+    Args:
+        charts: charts to build
+        jobs: number of worker processes. With 1, charts are built in the
+            main process.
+
+    Returns:
+        dictionary with the time taken by each chart built successfully, in
+        seconds, in the order in which the charts were given. Failures are
+        logged. Charts that depend on a failed chart are not built, every
+        other chart is.
+    """
+
+    # prepare shared inputs once, before any worker is started, so that
+    # datasets are read and indexed only once. A missing input makes the
+    # charts using it fail when they are built.
+    for name in sorted({d for chart in charts for d in chart.datasets}):
+        try:
+            if name in datasets.KEY_COLUMNS:
+                datasets.store(name)
+            else:
+                datasets.load(name)
+        except FileNotFoundError:
+            pass
+    for name in sorted({lookup for chart in charts for lookup in chart.lookups}):
+        try:
+            LOOKUPS[name]()
+        except FileNotFoundError:
+            pass
+
+    by_name = {chart.name: chart for chart in charts}
+    graph = TopologicalSorter(
+        {chart.name: [a for a in chart.after if a in by_name] for chart in charts}
+    )
+    graph.prepare()
+
+    timings, failed = {}, {}
+
+    def finish(name: str, result: Callable[[], float]) -> None:
+        try:
+            timings[name] = result()
+            graph.done(name)
+        except Exception as error:
+            failed[name] = error
+
+    if jobs == 1:
+        while graph.is_active():
+            ready = graph.get_ready()
+            if not ready:
+                break  # only charts depending on failed charts are left
+            for name in ready:
+                finish(name, lambda: _build(by_name[name]))
+
+    else:
+        with _pool(jobs) as pool:
+            running = {}
+            while graph.is_active():
+                for name in graph.get_ready():
+                    running[pool.submit(_build, by_name[name])] = name
+                if not running:
+                    break  # only charts depending on failed charts are left
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result)
+
+    for chart in charts:
+        if chart.name in timings:
+            logger.debug(f"Built {chart.name} in {timings[chart.name]:.2f}s")
+        elif chart.name in failed:
+            logger.error(f"Failed to build {chart.name}: {failed[chart.name]!r}")
+
+    return {
+        chart.name: timings[chart.name] for chart in charts if chart.name in timings
+    }
+
+
+def _usage(chart: Chart) -> dict[str, int]:
+    """Return the rows of the datasets used by a chart, and of its csv file"""
+
+    with open(PATHS.output / f"{chart.name}.csv") as f:
+        rows_out = sum(1 for _ in f) - 1  # header
+
+    return {
+        "rows_in": sum(datasets.count_rows(name) for name in chart.datasets),
+        "rows_out": rows_out,
+    }
+
+
+def update_charts(
+    charts: list[Chart], jobs: int = 1, force: bool = False
+) -> dict[str, float]:
+    """Build the charts whose inputs changed since their last build
+
+    Args:
+        charts: charts to update
+        jobs: number of worker processes
+        force: build every chart, even if its inputs did not change
+
+    Returns:
+        dictionary with the time taken by each chart that was built, in seconds
+
+    Raises:
+        RuntimeError: if any chart that needed to be built failed
+    """
+
+    current = fingerprints(charts)
+    to_build = charts if force else stale_charts(charts, current)
+
+    for chart in charts:
+        if chart not in to_build:
+            logger.debug(f"{chart.name} is up to date")
+
+    timings = build_charts(to_build, jobs=jobs)
+
+    _write_manifest(_read_manifest() | {name: current[name] for name in timings})
+
+    by_name = {chart.name: chart for chart in charts}
+    telemetry.record(
+        "charts",
+        {
+            name: {"seconds": seconds, **_usage(by_name[name])}
+            for name, seconds in timings.items()
+        },
+    )
+
+    if len(timings) < len(to_build):
+        raise RuntimeError(
+            f"Charts not built: {[c.name for c in to_build if c.name not in timings]}"
+        )
+
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Update DataDive charts")
+    parser.add_argument(
+        "charts", nargs="*", help="charts to build (default: all charts)"
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=os.cpu_count(),
+        help="number of charts built in parallel (default: number of cores)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild charts even if their inputs did not change",
+    )
+    args = parser.parse_args()
+
+    update_charts(_select(CHARTS, args.charts), jobs=args.jobs, force=args.force)
+
+
+if __name__ == "__main__":
+    """Update charts"""
+
+    main()
 
     logger.debug("All charts successfully updated")
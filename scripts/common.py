@@ -1,61 +1,210 @@
 """Common functions"""
 
+import functools
+import os
+import time
+from typing import Callable
+
+import numpy as np
 import pandas as pd
-import country_converter as coco
-from bblocks.import_tools.world_bank import WorldBankData
 
-from scripts.config import PATHS
+from scripts import countries, datasets
+
+
+def __getattr__(name: str):
+    """Build ISO_COUNTRY_DICT on first access rather than on import
+
+    It is then stored as a module global, so later accesses don't reach here.
+    """
 
-ISO_COUNTRY_DICT = (
-    coco.CountryConverter()
-    .data[["ISO3", "name_short"]]
-    .set_index("ISO3")["name_short"]
-    .to_dict()
-)
+    if name == "ISO_COUNTRY_DICT":
+        global ISO_COUNTRY_DICT
+        ISO_COUNTRY_DICT = countries.reference_table()["name_short"].to_dict()
+        return ISO_COUNTRY_DICT
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def only_countries(df: pd.DataFrame, iso_col: str = "iso_code") -> pd.DataFrame:
     """Filter a dataframe to keep only countries using a column of iso3 codes"""
 
-    return df.loc[lambda d: d[iso_col].isin(ISO_COUNTRY_DICT)].reset_index(drop=True)
+    return df.loc[
+        lambda d: d[iso_col].isin(countries.reference_table().index)
+    ].reset_index(drop=True)
 
 
-def latest_value(
-    df: pd.DataFrame, value_col: str, grouping_col: str | list, date_col
-) -> pd.DataFrame:
-    """Return the latest non null value for each group in a dataframe"""
+# caches created by `memoize`, so they can all be cleared at once
+_LOOKUP_CACHES: list[dict] = []
 
-    return (
-        df.dropna(subset=[value_col])
-        .loc[lambda d: d.groupby(grouping_col)[date_col].idxmax()]
-        .reset_index(drop=True)
-    )
 
+def memoize(
+    source: Callable[[], os.PathLike] | None = None, ttl: float | None = None
+) -> Callable:
+    """Decorator to keep the result of a reference lookup for the whole process
+
+    The cached result is computed again when the source file of the lookup
+    changes on disk, or when it is older than `ttl` seconds.
+
+    Args:
+        source: optional function returning the path of the file the lookup
+            is computed from. The cache is keyed on the modification time of
+            that file.
+        ttl: optional number of seconds after which the result expires.
+            Useful for lookups that are downloaded rather than read from disk.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cache = {}
+        _LOOKUP_CACHES.append(cache)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            version = os.stat(source()).st_mtime_ns if source is not None else None
+
+            if args in cache:
+                cached_version, created, result = cache[args]
+                expired = ttl is not None and time.monotonic() - created > ttl
+                if cached_version == version and not expired:
+                    return result
+
+            result = func(*args)
+            cache[args] = (version, time.monotonic(), result)
+
+            return result
 
+        wrapper.cache_clear = cache.clear
+
+        return wrapper
+
+    return decorator
+
+
+def clear_lookups() -> None:
+    """Invalidate every memoized reference lookup"""
+
+    for cache in _LOOKUP_CACHES:
+        cache.clear()
+
+
+def _as_list(columns: str | list) -> list:
+    return [columns] if isinstance(columns, str) else list(columns)
+
+
+def latest_value(
+    df: pd.DataFrame,
+    value_col: str | list,
+    grouping_col: str | list,
+    date_col: str,
+    as_of: int | None = None,
+    max_age: int | None = None,
+) -> pd.DataFrame:
+    """Return the row with the latest non null value for each group in a dataframe
+
+    Groups and dates are factorised to integer codes and sorted with a single
+    np.lexsort, and the first row of each group is kept. This is faster than
+    groupby().idxmax() and does not depend on the index of `df`. Many
+    indicators can be handled in a single call by including the indicator
+    column in `grouping_col`.
+
+    Args:
+        df: dataframe to get the latest values from
+        value_col: value column, or list of value columns. Only rows where all
+            of them are not null are considered.
+        grouping_col: column, or list of columns, identifying each group
+        date_col: column with the date (usually the year) of each value
+        as_of: optional date. Values after it are ignored.
+        max_age: optional maximum age of a value. Groups whose latest value is
+            older than `as_of` (or the latest date in the data) minus `max_age`
+            are dropped.
+
+    Returns:
+        dataframe with one row per group, sorted by group. When several rows of a
+        group share the latest date, the first one is kept.
+    """
+
+    valid = np.ones(len(df), dtype=bool)
+    for column in _as_list(value_col):
+        valid &= df[column].notna().to_numpy()
+
+    dates = df[date_col]
+    if as_of is not None:
+        valid &= (dates <= as_of).to_numpy()
+
+    # a single integer key per group, ordered like the group labels
+    group = np.zeros(len(df), dtype="int64")
+    for column in _as_list(grouping_col):
+        codes, labels = pd.factorize(df[column], sort=True)
+        valid &= codes >= 0
+        group = group * len(labels) + codes
+
+    # missing dates get code -1, so they come last once codes are negated
+    date_codes, _ = pd.factorize(dates, sort=True)
+
+    rows = np.flatnonzero(valid)
+    rows = rows[np.lexsort((-date_codes[rows], group[rows]))]
+    first = np.diff(group[rows], prepend=-1) != 0
+
+    latest = df.iloc[rows[first]]
+
+    if max_age is not None:
+        reference = as_of if as_of is not None else dates[valid].max()
+        latest = latest.loc[lambda d: d[date_col] >= reference - max_age]
+
+    return latest.reset_index(drop=True)
+
+
+def latest_lookup(
+    df: pd.DataFrame,
+    value_col: str,
+    key_col: str,
+    date_col: str,
+    by: str | None = None,
+    **kwargs,
+) -> dict:
+    """Return a dictionary with the latest value for each key
+
+    Args:
+        df: dataframe to get the latest values from
+        value_col: value column
+        key_col: column with the keys of the dictionary, e.g. "iso_code"
+        date_col: column with the date of each value
+        by: optional column, e.g. "indicator_code". If given, a dictionary is
+            returned for each of its values, all computed in a single pass.
+        **kwargs: `as_of` and `max_age`, passed to `latest_value`
+
+    Returns:
+        dictionary of key: latest value, or of `by` value: such dictionary
+    """
+
+    grouping = [by, key_col] if by is not None else [key_col]
+    latest = latest_value(df, value_col, grouping, date_col, **kwargs)
+
+    if by is None:
+        return latest.set_index(key_col)[value_col].to_dict()
+
+    return {
+        group: values.set_index(key_col)[value_col].to_dict()
+        for group, values in latest.groupby(by, sort=False)
+    }
+
+
+@memoize(source=lambda: datasets.raw_path("world_bank_wdi"))
 def female_population() -> dict:
     """Return latest values for female population for each country/region"""
 
-    return (
-        pd.read_csv(f"{PATHS.raw_data}/world_bank_wdi.csv")
-        .loc[lambda d: d.indicator_code == "SP.POP.TOTL.FE.IN"]
-        .assign(year=lambda d: pd.to_datetime(d["date"]).dt.year)
-        .pipe(latest_value, "value", "iso_code", "year")
-        .set_index("iso_code")["value"]
-        .to_dict()
-    )
+    population = datasets.query(
+        "world_bank_wdi", indicator_code="SP.POP.TOTL.FE.IN"
+    ).assign(year=datasets.years)
 
+    return latest_lookup(population, "value", "iso_code", "year")
 
+
+@memoize(source=lambda: datasets.raw_path("world_bank_wdi"))
 def gdp_per_capita() -> dict:
     """Return the latest values for gdp per capita for each country/region"""
 
-    # get gdp per capita data
-    gdp = WorldBankData().load_data("NY.GDP.PCAP.CD").get_data()
-
-    # get dictionary of latest values
-    return (
-        gdp.assign(year=lambda d: pd.to_datetime(d["date"]).dt.year)
-        .dropna(subset="value")
-        .pipe(latest_value, "value", "iso_code", "year")
-        .set_index("iso_code")["value"]
-        .to_dict()
+    gdp = datasets.query("world_bank_wdi", indicator_code="NY.GDP.PCAP.CD").assign(
+        year=datasets.years
     )
+
+    return latest_lookup(gdp, "value", "iso_code", "year")
@@ -9,3 +9,5 @@ class PATHS:
     output = project / "output"
     scripts = project / "scripts"
     logs = scripts / ".logs"
+    cache = project / ".cache"
+    http_cache = cache / "http"
@@ -0,0 +1,150 @@
+"""Country reference table and vectorised code conversion.
+
+`coco.convert` matches every element of its input against regular expressions,
+which is very slow on long columns. Instead, the country_converter data is
+shipped as a small csv file indexed by ISO3 code, which is read the first time
+it is needed, and columns are converted by mapping their unique codes only.
+
+Income levels come from the World Bank classification, which the extraction
+tools snapshot once a year into raw_data/income_levels.csv, so charts can add
+them without any network access.
+
+Run this module to refresh the csv file after updating country_converter:
+    python scripts/countries.py
+"""
+
+from functools import cache
+
+import numpy as np
+import pandas as pd
+
+from scripts import datasets
+from scripts.config import PATHS
+
+REFERENCE_FILE = PATHS.scripts / "countries.csv"
+
+# columns of the reference table, from the country_converter data
+REFERENCE_COLUMNS = ["name_short", "continent"]
+
+
+def build_reference_table() -> pd.DataFrame:
+    """Build the reference table from the country_converter data
+
+    Returns:
+        dataframe indexed by ISO3 code, with a column for each of REFERENCE_COLUMNS
+    """
+
+    import country_converter as coco
+
+    return (
+        coco.CountryConverter()
+        .data.loc[:, ["ISO3"] + REFERENCE_COLUMNS]
+        .drop_duplicates(subset="ISO3")
+        .set_index("ISO3")
+    )
+
+
+def update_reference_table() -> None:
+    """Write the reference table shipped with the scripts"""
+
+    build_reference_table().to_csv(REFERENCE_FILE)
+    reference_table.cache_clear()
+
+
+@cache
+def reference_table() -> pd.DataFrame:
+    """Return the reference table, reading it on first use"""
+
+    # "NA" and similar strings are valid names, not missing values
+    return pd.read_csv(REFERENCE_FILE, index_col="ISO3", keep_default_na=False)
+
+
+def convert(codes, to: str, not_found=np.nan) -> pd.Series:
+    """Convert ISO3 codes to another column of the reference table
+
+    Each distinct code is looked up once, and the result is broadcast back
+    to the full column.
+
+    Args:
+        codes: series (or list) of ISO3 codes
+        to: column of the reference table to convert to, e.g. "continent"
+        not_found: value used for codes missing from the reference table.
+            country_converter uses "not found".
+
+    Returns:
+        series with the converted values, aligned with `codes`
+    """
+
+    codes = pd.Series(codes)
+    positions, uniques = pd.factorize(codes)
+
+    converted = (
+        pd.Series(uniques)
+        .map(reference_table()[to])
+        .astype(object)
+        .where(lambda s: s.notna(), not_found)
+        .to_numpy()
+    )
+
+    # factorize marks missing codes with -1
+    values = np.where(positions >= 0, converted.take(positions), not_found)
+
+    return pd.Series(values, index=codes.index, name=to)
+
+
+def income_levels() -> pd.DataFrame:
+    """Return the snapshots of the World Bank income classification
+
+    Returns:
+        dataframe with the columns "iso_code", "income_level" and "year", the
+        year in which each classification was in effect
+    """
+
+    if not datasets.raw_path("income_levels").exists():
+        raise FileNotFoundError(
+            "No income classification in raw_data. Run the extraction tools first:"
+            " python scripts/extraction_tools/extract_data.py"
+        )
+
+    return datasets.load("income_levels")
+
+
+def add_income_level(
+    df: pd.DataFrame,
+    id_column: str,
+    year_column: str | None = None,
+    target_column: str = "income_level",
+) -> pd.DataFrame:
+    """Add a column with the World Bank income level of each row
+
+    Args:
+        df: dataframe to add the column to
+        id_column: column of ISO3 codes
+        year_column: optional column of years. If given, each row gets the
+            classification in effect in its year (the earliest available one
+            for years before the first snapshot). Otherwise every row gets the
+            latest classification.
+        target_column: name of the new column
+
+    Returns:
+        copy of `df` with the income level column. Codes without a
+        classification get NaN.
+    """
+
+    levels = income_levels()
+    snapshots = np.sort(levels["year"].unique())
+
+    if year_column is None:
+        versions = np.full(len(df), snapshots[-1])
+    else:
+        position = np.searchsorted(snapshots, df[year_column].to_numpy(), "right")
+        versions = snapshots[np.clip(position - 1, 0, None)]
+
+    lookup = levels.set_index(["year", "iso_code"])["income_level"]
+    keys = pd.MultiIndex.from_arrays([versions, df[id_column].to_numpy()])
+
+    return df.assign(**{target_column: lookup.reindex(keys).to_numpy()})
+
+
+if __name__ == "__main__":
+    update_reference_table()
@@ -0,0 +1,554 @@
+"""Registry of raw datasets used by the charts.
+
+Datasets are read lazily, the first time a chart asks for them, and kept
+in memory for the rest of the process. This way rebuilding a single chart
+only reads the files that chart actually uses.
+
+The csv files in raw_data are the public artifact. Each of them has a parquet
+twin with typed (categorical) columns, which is what the charts actually read.
+Twins are written by the extraction tools, and rebuilt from the csv if they
+are missing or older than the csv.
+
+Charts which take several slices of the same dataset use a `Store`, which
+holds the whole dataset in memory with a sorted (indicator, entity, year)
+index, so each slice is a binary search rather than a scan of every row.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as pa_dataset
+from pyarrow.parquet import filters_to_expression
+from pandas.api.types import is_datetime64_any_dtype, is_string_dtype
+
+from scripts import telemetry
+from scripts.config import PATHS
+
+# name of the dataset: file name in the raw_data folder
+RAW_FILES = {
+    "uis": "uis.csv",
+    "hdr_gii": "hdr_gii.csv",
+    "hdr_gdi": "hdr_gdi.csv",
+    "ilo": "ilo.csv",
+    "world_bank_wdi": "world_bank_wdi.csv",
+    "world_bank_gender": "world_bank_gender.csv",
+    "world_bank_law": "world_bank_law.csv",
+    "mmr2020_country_estimates": "mmr2020_country_estimates.csv",
+    "mmr2020_region_estimates": "mmr2020_region_estimates.csv",
+    "unwomen_pardee_poverty": "unwomen_pardee_poverty.csv",
+    "income_levels": "income_levels.csv",
+}
+
+# column holding the indicator code of each dataset. Parquet twins are sorted
+# on it, so that each row group only holds a few indicators and can be skipped
+# when reading filtered data
+INDICATOR_COLUMNS = {
+    "uis": "INDICATOR_ID",
+    "hdr_gii": "variable",
+    "hdr_gdi": "variable",
+    "ilo": "indicator",
+    "world_bank_wdi": "indicator_code",
+    "world_bank_gender": "indicator_code",
+    "world_bank_law": "indicator_code",
+    "mmr2020_country_estimates": "parameter",
+    "mmr2020_region_estimates": "parameter",
+    "unwomen_pardee_poverty": "variable_code",
+}
+
+# columns holding the indicator, entity and year of each row of a dataset,
+# used as the index of its Store
+KEY_COLUMNS = {
+    "uis": ("INDICATOR_ID", "COUNTRY_ID", "YEAR"),
+    "hdr_gii": ("variable", "iso3", "year"),
+    "hdr_gdi": ("variable", "iso3", "year"),
+    "world_bank_wdi": ("indicator_code", "iso_code", "year"),
+    "world_bank_gender": ("indicator_code", "iso_code", "year"),
+    "world_bank_law": ("indicator_code", "iso_code", "year"),
+    "mmr2020_country_estimates": ("parameter", "iso_code", "year"),
+    "mmr2020_region_estimates": ("parameter", "region", "year"),
+    "unwomen_pardee_poverty": ("variable_code", "region_name", "year"),
+}
+
+ROW_GROUP_SIZE = 50_000
+
+
+def raw_path(name: str) -> os.PathLike:
+    """Return the path to the csv file of a dataset"""
+
+    if name not in RAW_FILES:
+        raise ValueError(f"Unknown dataset: {name}. Available: {list(RAW_FILES)}")
+
+    return PATHS.raw_data / RAW_FILES[name]
+
+
+def parquet_path(name: str) -> os.PathLike:
+    """Return the path to the parquet twin of a dataset"""
+
+    return raw_path(name).with_suffix(".parquet")
+
+
+def years(df: pd.DataFrame) -> pd.Series:
+    """Return the year of each row of a World Bank dataset, as int16
+
+    Files extracted since the year column was added store it directly. For
+    older files, the year is taken from the first four characters of the
+    date, which avoids parsing date strings row by row.
+
+    Args:
+        df: dataframe with a `year` column, or a `date` column holding
+            datetimes or ISO date strings
+
+    Returns:
+        series of years
+    """
+
+    if "year" in df.columns:
+        return df["year"]
+
+    if is_datetime64_any_dtype(df["date"]):
+        return df["date"].dt.year.astype("int16")
+
+    return df["date"].astype(str).str.slice(0, 4).astype("int16")
+
+
+def optimise_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert repeated strings to categoricals and years to integers
+
+    Args:
+        df: dataframe to convert
+
+    Returns:
+        dataframe with categorical string columns and int16 year columns
+    """
+
+    df = df.copy()
+
+    for column in df.columns:
+        if is_string_dtype(df[column]) and df[column].nunique() < len(df) / 2:
+            df[column] = df[column].astype("category")
+        elif column.lower() == "year" and df[column].notna().all():
+            df[column] = df[column].astype("int16")
+
+    return df
+
+
+@contextmanager
+def atomic_path(path: os.PathLike) -> Iterator[Path]:
+    """Yield a temporary path which replaces `path` when the block succeeds
+
+    Writing to the temporary path and renaming it means a failed or interrupted
+    write never leaves a half written file behind.
+    """
+
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def write_parquet(df: pd.DataFrame, name: str) -> None:
+    """Write the typed parquet twin of a dataset
+
+    Args:
+        df: dataframe with the content of the raw csv file
+        name: name of the dataset
+    """
+
+    sort_columns = [c for c in [INDICATOR_COLUMNS.get(name)] if c in df.columns]
+
+    # stable sort, so rows keep their original order within each indicator
+    with atomic_path(parquet_path(name)) as path:
+        (
+            df.pipe(optimise_dtypes)
+            .sort_values(sort_columns, kind="stable")
+            .reset_index(drop=True)
+            .to_parquet(path, index=False, row_group_size=ROW_GROUP_SIZE)
+        )
+
+
+def write_raw(df: pd.DataFrame, name: str) -> None:
+    """Save a raw dataset as csv, along with its parquet twin
+
+    Args:
+        df: dataframe to save
+        name: name of the dataset, one of the keys of RAW_FILES
+    """
+
+    with atomic_path(raw_path(name)) as path:
+        df.to_csv(path, index=False)
+
+    write_parquet(df, name)
+    telemetry.count(rows_out=len(df))
+
+
+def _twin_is_fresh(name: str) -> bool:
+    """Check that the parquet twin exists and is not older than the csv"""
+
+    twin = parquet_path(name)
+
+    return twin.exists() and twin.stat().st_mtime >= raw_path(name).stat().st_mtime
+
+
+def ensure_parquet(name: str) -> None:
+    """Create the parquet twin of a dataset if it is missing or stale"""
+
+    if not _twin_is_fresh(name):
+        write_parquet(pd.read_csv(raw_path(name)), name)
+
+
+def count_rows(name: str) -> int:
+    """Return the number of rows of a dataset, from the metadata of its twin"""
+
+    ensure_parquet(name)
+
+    return pa_dataset.dataset(parquet_path(name)).count_rows()
+
+
+def _version(name: str) -> int:
+    """Return the modification time of the csv file of a dataset, so that
+    datasets held in memory are read again when the file changes"""
+
+    return os.stat(raw_path(name)).st_mtime_ns
+
+
+@cache
+def _read(
+    name: str, version: int, columns: tuple | None, filters: tuple | None
+) -> pd.DataFrame:
+    """Read a dataset from its parquet twin, creating the twin if needed
+
+    The twin is streamed in record batches. Row groups which cannot match the
+    filters are skipped, and each batch is filtered as it is read, so only the
+    matching rows are ever held in memory.
+    """
+
+    ensure_parquet(name)
+
+    dataset = pa_dataset.dataset(parquet_path(name), format="parquet")
+    batches = dataset.to_batches(
+        columns=list(columns) if columns is not None else None,
+        filter=filters_to_expression(list(filters)) if filters else None,
+    )
+
+    df = pa.Table.from_batches(
+        batches,
+        schema=dataset.schema
+        if columns is None
+        else pa.schema([dataset.schema.field(c) for c in columns]),
+    ).to_pandas()
+
+    # strings are dictionary encoded on disk, so they don't need to be parsed.
+    # They are decoded after filtering because categoricals change how charts
+    # pivot, map and group labels
+    for column in df.select_dtypes("category"):
+        df[column] = df[column].astype(object)
+
+    return df
+
+
+def _hashable(value):
+    """Convert lists and sets to tuples so they can be used as cache keys"""
+
+    if isinstance(value, (list, set, tuple)):
+        return tuple(value)
+
+    return value
+
+
+def load(
+    name: str, columns: list | None = None, filters: list | None = None
+) -> pd.DataFrame:
+    """Return a raw dataset, reading it from disk on first use
+
+    Args:
+        name: name of the dataset, one of the keys of RAW_FILES
+        columns: optional list of columns to read. Other columns are not read.
+        filters: optional list of pyarrow filters, for example
+            [("indicator_code", "in", ["SP.POP.TOTL"])]. Row groups that
+            cannot match the filters are skipped.
+
+    Returns:
+        the raw dataset. The same object is returned on every call with the same
+        arguments while the csv file is unchanged, so callers should not modify
+        it in place.
+    """
+
+    return _read(
+        name,
+        _version(name),
+        _hashable(columns) if columns is not None else None,
+        tuple((c, op, _hashable(v)) for c, op, v in filters) if filters else None,
+    )
+
+
+def query(name: str, columns: list | None = None, **conditions) -> pd.DataFrame:
+    """Return only the rows of a dataset which match the given conditions
+
+    Conditions are pushed down to the parquet reader, so peak memory depends on
+    the size of the matching rows, not on the size of the dataset.
+
+    Args:
+        name: name of the dataset, one of the keys of RAW_FILES
+        columns: optional list of columns to read
+        **conditions: column=value pairs. The value can be a single value,
+            a list of values, or a slice for an inclusive range. For example
+            `query("world_bank_wdi", indicator_code=["SP.POP.TOTL"],
+            iso_code="WLD")` or `query("mmr2020_region_estimates",
+            year=slice(2015, None))`.
+
+    Returns:
+        dataframe with the matching rows
+    """
+
+    return load(name, columns=columns, filters=_filters(conditions))
+
+
+def _filters(conditions: dict) -> list:
+    """Convert column=value conditions to pyarrow style filters"""
+
+    filters = []
+
+    for column, value in conditions.items():
+        if isinstance(value, slice):
+            if value.start is not None:
+                filters.append((column, ">=", value.start))
+            if value.stop is not None:
+                filters.append((column, "<=", value.stop))
+        elif isinstance(value, (list, set, tuple)):
+            filters.append((column, "in", list(value)))
+        else:
+            filters.append((column, "==", value))
+
+    return filters
+
+
+def _matches(values: pd.Series, value) -> pd.Series:
+    """Return a mask of the values matching a condition, as used in `query`"""
+
+    if isinstance(value, slice):
+        mask = pd.Series(True, index=values.index)
+        if value.start is not None:
+            mask &= values >= value.start
+        if value.stop is not None:
+            mask &= values <= value.stop
+        return mask
+
+    if isinstance(value, (list, set, tuple)):
+        return values.isin(list(value))
+
+    return values == value
+
+
+class Store:
+    """A dataset held in memory, indexed on its indicator, entity and year
+
+    The index is sorted once, when the store is created. Selecting an
+    indicator, a list of entities and a range of years is then a binary search
+    on the index, rather than a boolean mask over every row.
+
+    Args:
+        df: the dataset
+        keys: names of the indicator, entity and year columns
+    """
+
+    def __init__(self, df: pd.DataFrame, keys: tuple[str, str, str]):
+        self.data = df
+        self.keys = keys
+
+        # stable sort, so rows with the same key keep their original order
+        self.index, self._rows = pd.MultiIndex.from_frame(
+            df.loc[:, list(keys)]
+        ).sortlevel(list(range(len(keys))))
+
+    def _selection(self, level: int, value) -> slice | list:
+        """Return the labels to select on a level of the index"""
+
+        if value is None:
+            return slice(None)
+        if isinstance(value, slice):
+            return value
+        if not isinstance(value, (list, set, tuple)):
+            value = [value]
+
+        # labels missing from the index are ignored, as in `query`
+        return [label for label in value if label in self.index.levels[level]]
+
+    def get(
+        self,
+        indicator=None,
+        entities=None,
+        years=None,
+        columns: list | None = None,
+        **conditions,
+    ) -> pd.DataFrame:
+        """Return the rows matching an indicator, entities and years
+
+        Args:
+            indicator: an indicator, or a list of indicators. All if None.
+            entities: an entity, or a list of entities. All if None.
+            years: a year, a list of years, or a slice for an inclusive range of
+                years, e.g. slice(2019, None). All if None.
+            columns: optional list of columns to return
+            **conditions: other column=value conditions, as in `query`. They
+                are applied to the selected rows only.
+
+        Returns:
+            dataframe with the matching rows, in the order of the dataset
+        """
+
+        selection = [
+            self._selection(level, value)
+            for level, value in enumerate([indicator, entities, years])
+        ]
+
+        positions = np.array([], dtype=int)
+        if not any(isinstance(labels, list) and not labels for labels in selection):
+            try:
+                positions = self.index.get_locs(selection)
+            except KeyError:
+                # the labels exist on their own levels, but not together
+                # (e.g. an entity with no rows for the indicator)
+                pass
+
+        df = self.data.iloc[np.sort(self._rows[positions])]
+
+        for column, value in conditions.items():
+            df = df.loc[_matches(df[column], value)]
+
+        if columns is not None:
+            df = df.loc[:, columns]
+
+        return df.reset_index(drop=True)
+
+
+@cache
+def _store(name: str, version: int) -> Store:
+    df = load(name)
+
+    # World Bank files extracted before the year column was added
+    if "year" in KEY_COLUMNS[name] and "year" not in df.columns:
+        df = df.assign(year=years)
+
+    return Store(df, KEY_COLUMNS[name])
+
+
+def store(name: str) -> Store:
+    """Return the Store of a dataset, creating it on first use, and again
+    when its csv file changes"""
+
+    if name not in KEY_COLUMNS:
+        raise ValueError(
+            f"No store for dataset: {name}. Available: {list(KEY_COLUMNS)}"
+        )
+
+    return _store(name, _version(name))
+
+
+AFROBAROMETER_FILE = "afrobarometer.sav"
+
+# number of respondents read from the survey file at a time
+SURVEY_CHUNK_SIZE = 10_000
+
+
+def _compact_codes(values: pd.Series) -> pd.Series:
+    """Store survey codes, which are read as floats, as the smallest integer type"""
+
+    if values.notna().all() and (values % 1 == 0).all():
+        return pd.to_numeric(values, downcast="integer")
+
+    return values
+
+
+def _read_survey(columns: list) -> pd.DataFrame:
+    """Read some columns of the Afrobarometer survey, one chunk of rows at a time"""
+
+    import pyreadstat
+
+    chunks = pyreadstat.read_file_in_chunks(
+        pyreadstat.read_sav,
+        PATHS.raw_data / AFROBAROMETER_FILE,
+        chunksize=SURVEY_CHUNK_SIZE,
+        usecols=columns,
+    )
+
+    return pd.concat(
+        [chunk.apply(_compact_codes) for chunk, _ in chunks], ignore_index=True
+    ).apply(_compact_codes)
+
+
+@cache
+def afrobarometer(columns: tuple) -> pd.DataFrame:
+    """Return some columns of the Afrobarometer round 7 survey data
+
+    Only the requested columns are read from the .sav file, in chunks of rows,
+    and answers are kept as small integer codes. Use `afrobarometer_labels`
+    to get the labels of the codes. The result is cached as parquet, and
+    read from the cache until the survey file changes.
+
+    Args:
+        columns: names of the survey variables to read, e.g. ("COUNTRY", "Q101")
+
+    Returns:
+        dataframe with a column of codes for each variable
+    """
+
+    columns = list(columns)
+    source = PATHS.raw_data / AFROBAROMETER_FILE
+    cached = PATHS.cache / "afrobarometer" / f"{'-'.join(columns)}.parquet"
+
+    if cached.exists() and cached.stat().st_mtime >= source.stat().st_mtime:
+        return pd.read_parquet(cached)
+
+    df = _read_survey(columns)
+
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_path(cached) as path:
+        df.to_parquet(path, index=False)
+
+    return df
+
+
+@cache
+def _afrobarometer_metadata():
+    """Read the metadata of the survey, without any of its data"""
+
+    import pyreadstat
+
+    return pyreadstat.read_sav(PATHS.raw_data / AFROBAROMETER_FILE, metadataonly=True)[
+        1
+    ]
+
+
+def afrobarometer_labels(column: str) -> dict:
+    """Return the labels of the codes of a survey variable
+
+    Args:
+        column: name of the survey variable
+
+    Returns:
+        dictionary of code: label
+    """
+
+    metadata = _afrobarometer_metadata()
+
+    return metadata.value_labels[metadata.variable_to_label[column]]
+
+
+def clear_cache() -> None:
+    """Drop every dataset held in memory so that the next call reads from disk"""
+
+    _read.cache_clear()
+    _store.cache_clear()
+    afrobarometer.cache_clear()
+    _afrobarometer_metadata.cache_clear()
@@ -1,7 +1,10 @@
 """Extract data from Afrobarometer data files."""
 
-import requests
+import shutil
+
+from scripts import datasets
 from scripts.config import PATHS
+from scripts.extraction_tools import http_cache
 from scripts.logger import logger
 
 URL = "https://www.afrobarometer.org/wp-content/uploads/2022/02/r7_merged_data_34ctry.release.sav"
@@ -10,10 +13,8 @@ URL = "https://www.afrobarometer.org/wp-content/uploads/2022/02/r7_merged_data_3
 def get_afrobarometer_data():
     """Download Afrobarometer data from the website."""
 
-    response = requests.get(URL)
-
-    with open(PATHS.raw_data / "afrobarometer.sav", "wb") as f:
-        f.write(response.content)
+    with datasets.atomic_path(PATHS.raw_data / "afrobarometer.sav") as path:
+        shutil.copyfile(http_cache.fetch(URL), path)
 
     logger.debug(f"Successfully downloaded Afrobarometer data")
 
@@ -1,16 +1,20 @@
 """Main extraction script."""
 
+import argparse
+import functools
+import zipfile
+from typing import NamedTuple
+
 import pandas as pd
+import wbgapi
 from bblocks.import_tools import hdr
 from unesco_reader import uis
-from bblocks.import_tools.unzip import read_zipped_csv
 from bblocks.import_tools import ilo
-from bblocks.import_tools import world_bank
 from bblocks.cleaning_tools import clean
-import country_converter as coco
 import numpy as np
 
-from scripts.config import PATHS
+from scripts import countries, datasets
+from scripts.extraction_tools import http_cache, runner
 from scripts.logger import logger
 
 
@@ -24,7 +28,7 @@ def hdr_gii() -> None:
         hdr.HDR()
         .load_data(hdr.available_indicators("gii"))
         .get_data(hdr.available_indicators("gii"))
-        .to_csv(f"{PATHS.raw_data}/hdr_gii.csv", index=False)
+        .pipe(datasets.write_raw, "hdr_gii")
     )
     logger.debug("Extracted GII data from HDR")
 
@@ -36,7 +40,7 @@ def hdr_gdi() -> None:
         hdr.HDR()
         .load_data(hdr.available_indicators("gdi"))
         .get_data(hdr.available_indicators("gdi"))
-        .to_csv(f"{PATHS.raw_data}/hdr_gdi.csv", index=False)
+        .pipe(datasets.write_raw, "hdr_gdi")
     )
     logger.debug("Extracted GDI data from HDR")
 
@@ -61,14 +65,292 @@ WB_REGION_INCOME_CODES = {
 }
 
 
-def _extract_wb_data(indicators: dict, db: int) -> pd.DataFrame:
-    """Retrieve world Bank Data"""
+# maximum number of rows per page of a World Bank API response
+WB_PAGE_SIZE = 20_000
+
+# number of years before the latest stored year of an indicator and country
+# which are requested again, as the World Bank revises recent values
+WB_REVISION_YEARS = 2
+
+# month of the yearly run which requests the full history of every World
+# Bank indicator, to pick up revisions of older years
+WB_FULL_REFRESH_MONTH = 1
+
+
+class WorldBankQuery(NamedTuple):
+    """A batched request for World Bank indicators of the same database"""
+
+    db: int
+    indicators: list[str]
+    start_year: int | None = None  # None for every year
+    end_year: int | None = None  # None for up to the latest year
+    economies: list[str] | None = None  # None for every economy
+
+
+class WorldBankFile(NamedTuple):
+    """A raw file of World Bank indicators, all from the same database"""
+
+    name: str
+    db: int
+    indicators: dict[str, str]
+
+
+WB_FILES = [
+    WorldBankFile(
+        "world_bank_wdi",
+        db=2,
+        indicators={
+            "SP.POP.TOTL.FE.IN": "Female population",
+            "SP.POP.TOTL": "Population total",
+            "SH.STA.MMRT": "Maternal mortality",
+            "SP.DYN.TFRT.IN": "Fertility rate",
+            "NY.GDP.PCAP.CD": "GDP per capita (current US$)",
+        },
+    ),
+    # Gender Data Portal
+    WorldBankFile(
+        "world_bank_gender",
+        db=14,
+        indicators={
+            "SG.GEN.PARL.ZS": "Proportion of seats held by women in national parliaments (%)",
+            "HD.HCI.EYRS.FE": "Expected Years of School, Female",
+            "SP.ADO.TFRT": "Adolescent fertility rate (births per 1,000 women ages 15-19)",
+            "SH.STA.FGMS.ZS": "Female genital mutilation prevalence (%)",
+            "SG.VAW.1549.ZS": "Proportion of women subjected to physical and/or sexual violence in the last 12 months (% of ever-partnered women ages 15-49)",
+            "SG.VAW.AFSX.ZS": "Proportion of women who have ever experienced any form of sexual violence (% of women ages 15-49)",
+            "SG.TIM.UWRK.MA": "Proportion of time spent on unpaid domestic and care work, female (% of 24 hour day)- males",
+            "SG.TIM.UWRK.FE": "Proportion of time spent on unpaid domestic and care work, female (% of 24 hour day) - females",
+            "SL.TLF.CACT.FE.ZS": "Labor force participation rate, female (% of female population ages 15+) (modeled ILO estimate)",
+            "SL.TLF.CACT.MA.ZS": "Labor force participation rate, male (% of male population ages 15+) (modeled ILO estimate)",
+            "SE.ENR.PRSC.FM.ZS": "School enrollment, primary and secondary (gross), gender parity index (GPI)",
+        },
+    ),
+    # Gender Data Portal, Women Business and the Law
+    WorldBankFile(
+        "world_bank_law",
+        db=14,
+        indicators={
+            "SG.LAW.EQRM.WK": "Does the law require equal pay for equal work?",
+            "SG.LAW.NODC.HR": "Does the law prohibit gender discrimination in the workplace?",
+            "SG.GET.JOBS.EQ": "Can a woman get a job in the same way as a man?",
+            "SG.CNT.SIGN.EQ": "Can a woman sign a contract in the same way as a man?",
+            "SG.PEN.SXHR.EM": "Are there criminal penalties for sexual harassment in in the workplace?",
+        },
+    ),
+]
+
+
+def world_bank_plan(
+    files: list[WorldBankFile], start_years: pd.Series | None = None
+) -> list[WorldBankQuery]:
+    """Plan the queries needed to extract World Bank files
+
+    The indicators of each database are requested together. Indicators with
+    start years are requested for every economy from the earliest of their
+    latest start years. The economies which lag behind it (e.g. countries
+    whose last survey is older) are requested separately, from their own
+    start year, so their new values are not missed. Indicators without start
+    years (e.g. new ones) are requested in full.
+
+    Args:
+        files: files to extract
+        start_years: optional series of the first year to request, indexed
+            by indicator code and iso code. By default, the full history of
+            every indicator is requested.
+
+    Returns:
+        list of queries, each indicator being requested once per period
+    """
+
+    if start_years is None:
+        start_years = _stored_start_years([])
+
+    queries = []
+    for db in dict.fromkeys(file.db for file in files):
+        codes = list(
+            dict.fromkeys(code for f in files if f.db == db for code in f.indicators)
+        )
+        stored = start_years.loc[lambda s: s.index.isin(codes, level=0)]
+
+        new = [code for code in codes if code not in stored.index.unique(level=0)]
+        if new:
+            queries.append(WorldBankQuery(db, new))
+        if stored.empty:
+            continue
+
+        start = int(stored.groupby(level=0).max().min())
+        queries.append(
+            WorldBankQuery(db, [c for c in codes if c not in new], start_year=start)
+        )
+
+        lagging = stored.loc[lambda s: s < start]
+        if not lagging.empty:
+            queries.append(
+                WorldBankQuery(
+                    db,
+                    list(lagging.index.unique(level=0)),
+                    start_year=int(lagging.min()),
+                    end_year=start - 1,
+                    economies=sorted(lagging.index.unique(level=1)),
+                )
+            )
+
+    return queries
+
+
+def _start_years(stored: pd.DataFrame) -> pd.Series:
+    """Return the first year to request for each indicator and country stored
+
+    This is WB_REVISION_YEARS before the latest year with a value of the
+    indicator for the country. Values of years before it, and values for
+    countries which had none, are only picked up by a full refresh.
+
+    Args:
+        stored: World Bank data, with indicator_code, iso_code, date and value
+            columns
+
+    Returns:
+        series of years, indexed by indicator code and iso code
+    """
+
+    return (
+        stored.dropna(subset="value")
+        .assign(year=datasets.years)
+        .groupby(["indicator_code", "iso_code"])["year"]
+        .max()
+        .sub(WB_REVISION_YEARS)
+        .astype(int)
+    )
+
+
+def _stored_start_years(files: list[WorldBankFile]) -> pd.Series:
+    """Return the first year to request for each indicator and country
+    stored in the raw files"""
+
+    columns = ["indicator_code", "iso_code", "date", "value"]
+
+    return pd.concat(
+        [pd.DataFrame(columns=columns)]
+        + [
+            pd.read_csv(path, usecols=columns)
+            for path in (datasets.raw_path(file.name) for file in files)
+            if path.exists()
+        ]
+    ).pipe(_start_years)
+
+
+def _latest_wb_year(db: int) -> int:
+    """Return the latest year of a World Bank database"""
+
+    return max(int(year) for year in wbgapi.time.periods(db) if str(year).isdigit())
+
+
+def _fetch_wb_data(query: WorldBankQuery) -> pd.DataFrame:
+    """Retrieve the World Bank data of a query
+
+    wbgapi requests all the indicators in a single query, which is paged, and
+    only split if its url gets too long for the API. Years are capped at the
+    latest period of the database, as wbgapi rejects years it does not have.
+    """
+
+    if query.start_year is None:
+        time = "all"
+    else:
+        latest = _latest_wb_year(query.db)
+        time = range(query.start_year, min(query.end_year or latest, latest) + 1)
+
+    rows = (
+        wbgapi.data.fetch(
+            query.indicators,
+            economy=query.economies or "all",
+            time=time,
+            db=query.db,
+            numericTimeKeys=True,
+            params={"per_page": WB_PAGE_SIZE},
+        )
+        if time
+        else []
+    )
+
+    return (
+        pd.DataFrame.from_records(rows, columns=["series", "economy", "time", "value"])
+        .rename(
+            columns={"series": "indicator_code", "economy": "iso_code", "time": "year"}
+        )
+        .assign(
+            date=lambda d: pd.to_datetime(d.year.astype(str), format="%Y"),
+            value=lambda d: d.value.astype("float64"),
+        )
+        .filter(["date", "iso_code", "indicator_code", "value"])
+    )
+
+
+def _first_years(
+    df: pd.DataFrame, queries: list[WorldBankQuery], start_years: pd.Series
+) -> pd.Series:
+    """Return the first year fetched for the indicator and country of each row
+
+    Args:
+        df: World Bank data
+        queries: the queries which were fetched
+        start_years: the start years the queries were planned with
+
+    Returns:
+        series of years, aligned with df. 0 for indicators fetched in full,
+        NaN for indicators which were not fetched.
+    """
+
+    # every economy is fetched from the start year of these queries
+    fetched = {
+        code: query.start_year or 0
+        for query in queries
+        if query.economies is None
+        for code in query.indicators
+    }
+    first = df.indicator_code.map(fetched)
+    pairs = pd.MultiIndex.from_frame(df.loc[:, ["indicator_code", "iso_code"]])
+
+    # lagging economies are also fetched from their own, earlier, start year
+    return (
+        pd.Series(start_years.reindex(pairs).to_numpy(), index=df.index)
+        .fillna(first)
+        .clip(upper=first)
+        .where(first.notna())
+    )
+
+
+def _merge_wb_data(fetched: pd.DataFrame, stored: pd.DataFrame, first) -> pd.DataFrame:
+    """Replace the stored values of the years fetched for each indicator and
+    country
+
+    Args:
+        fetched: cleaned data fetched for the indicators of a file
+        stored: the file as stored in raw_data
+        first: function returning the first year fetched for each row of a
+            dataframe, NaN for indicators which were not fetched. Stored rows
+            of these indicators are dropped.
+
+    Returns:
+        merged data, sorted by indicator, country and date
+    """
 
-    wb = world_bank.WorldBankData()
-    wb.load_data(list(indicators.keys()), db=db)
     return (
-        wb.get_data()
+        stored.assign(year=datasets.years, date=lambda d: pd.to_datetime(d.date))
+        .loc[lambda d: d.year < first(d)]
+        .pipe(lambda d: pd.concat([fetched, d]))
+        .sort_values(["indicator_code", "iso_code", "date"])
+        .reset_index(drop=True)
+    )
+
+
+def _clean_wb_data(df: pd.DataFrame, indicators: dict) -> pd.DataFrame:
+    """Add indicator and entity names to World Bank data, keeping only the
+    countries, regions and income groups which can be named"""
+
+    return (
+        df.sort_values(["indicator_code", "iso_code", "date"])
         .assign(
+            year=datasets.years,
             indicator_name=lambda d: d.indicator_code.map(indicators),
             entity_name=lambda d: clean.convert_id(
                 d.iso_code,
@@ -83,70 +365,98 @@ def _extract_wb_data(indicators: dict, db: int) -> pd.DataFrame:
     )
 
 
-def wb_wdi() -> None:
-    """Extract data from World Bank WDI and save to csv called world_bank_wdi.csv"""
+def world_bank(full: bool = False) -> None:
+    """Extract every file of WB_FILES from the World Bank API
 
-    indicators = {
-        "SP.POP.TOTL.FE.IN": "Female population",
-        "SP.POP.TOTL": "Population total",
-        "SH.STA.MMRT": "Maternal mortality",
-        "SP.DYN.TFRT.IN": "Fertility rate",
-    }
-
-    (
-        _extract_wb_data(indicators, db=2).to_csv(
-            f"{PATHS.raw_data}/world_bank_wdi.csv", index=False
-        )
-    )
-    logger.debug("Extracted WDI data from World Bank")
+    The indicators of all files are requested together, with as few queries
+    per database as possible, and the results are split back into the files.
+    This keeps the number of requests to the (rate limited) API to a minimum.
 
+    Only the years from WB_REVISION_YEARS before the latest stored year of
+    each indicator and country are requested, and merged into the stored
+    files. Revisions of older years, and values for countries which had
+    none, are picked up by the full history, which is requested for new
+    indicators and files, and for every indicator in the
+    WB_FULL_REFRESH_MONTH run.
 
-def wb_gender() -> None:
-    """Extract gender data from World Bank Gender Data Portal
-    and save to csv called world_bank_wdi.csv
+    Args:
+        full: request the full history of every indicator
     """
 
-    indicators = {
-        "SG.GEN.PARL.ZS": "Proportion of seats held by women in national parliaments (%)",
-        "HD.HCI.EYRS.FE": "Expected Years of School, Female",
-        "SP.ADO.TFRT": "Adolescent fertility rate (births per 1,000 women ages 15-19)",
-        "SH.STA.FGMS.ZS": "Female genital mutilation prevalence (%)",
-        "SG.VAW.1549.ZS": "Proportion of women subjected to physical and/or sexual violence in the last 12 months (% of ever-partnered women ages 15-49)",
-        "SG.VAW.AFSX.ZS": "Proportion of women who have ever experienced any form of sexual violence (% of women ages 15-49)",
-        "SG.TIM.UWRK.MA": "Proportion of time spent on unpaid domestic and care work, female (% of 24 hour day)- males",
-        "SG.TIM.UWRK.FE": "Proportion of time spent on unpaid domestic and care work, female (% of 24 hour day) - females",
-        "SL.TLF.CACT.FE.ZS": "Labor force participation rate, female (% of female population ages 15+) (modeled ILO estimate)",
-        "SL.TLF.CACT.MA.ZS": "Labor force participation rate, male (% of male population ages 15+) (modeled ILO estimate)",
-        "SE.ENR.PRSC.FM.ZS": "School enrollment, primary and secondary (gross), gender parity index (GPI)",
-    }
+    full = full or pd.Timestamp.now().month == WB_FULL_REFRESH_MONTH
+    start_years = _stored_start_years([] if full else WB_FILES)
+    queries = world_bank_plan(WB_FILES, start_years)
+
+    def first(df: pd.DataFrame) -> pd.Series:
+        return _first_years(df, queries, start_years)
+
+    fetched = []
+    for query in queries:
+        data = _fetch_wb_data(query)
+        fetched.append(data)
+        logger.debug(
+            f"Fetched {len(data)} rows of {len(query.indicators)} indicators from "
+            f"World Bank db {query.db}, from {query.start_year or 'the first year'}"
+            f" for {len(query.economies or []) or 'all'} economies"
+        )
 
-    (
-        _extract_wb_data(indicators, db=14).to_csv(
-            f"{PATHS.raw_data}/world_bank_gender.csv", index=False
+    # lagging economies are fetched for years which other economies of the
+    # same query already had
+    fetched = pd.concat(fetched).loc[lambda d: datasets.years(d) >= first(d)]
+
+    for file in WB_FILES:
+        path = datasets.raw_path(file.name)
+        stored = (
+            pd.read_csv(path)
+            if path.exists()
+            else pd.DataFrame(columns=["date", "indicator_code", "iso_code"])
         )
-    )
-    logger.debug("Extracted gender data from World Bank")
+        (
+            fetched.loc[lambda d: d.indicator_code.isin(file.indicators)]
+            .pipe(_clean_wb_data, file.indicators)
+            .pipe(_merge_wb_data, stored, first)
+            .pipe(datasets.write_raw, file.name)
+        )
+        logger.debug(f"Extracted {file.name} from World Bank")
+
+
+INCOME_LEVELS_URL = (
+    "https://databank.worldbank.org/data/download/site-content/CLASS.xlsx"
+)
 
 
-def wb_law() -> None:
-    """Extract law data from World Bank Gender Data Portal
-    and save to csv called world_bank_wdi.csv
+def wb_income_levels() -> None:
+    """Snapshot the current World Bank income classification to income_levels.csv
+
+    The file keeps one classification per year, so charts can use the
+    classification in effect in a given year. The snapshot of the current
+    year is replaced on every run, so it holds the latest classification
+    published that year.
     """
 
-    indicators = {
-        "SG.LAW.EQRM.WK": "Does the law require equal pay for equal work?",
-        "SG.LAW.NODC.HR": "Does the law prohibit gender discrimination in the workplace?",
-        "SG.GET.JOBS.EQ": "Can a woman get a job in the same way as a man?",
-        "SG.CNT.SIGN.EQ": "Can a woman sign a contract in the same way as a man?",
-        "SG.PEN.SXHR.EM": "Are there criminal penalties for sexual harassment in in the workplace?",
-    }
+    year = pd.Timestamp.now().year
 
-    (
-        _extract_wb_data(indicators, db=14).to_csv(
-            f"{PATHS.raw_data}/world_bank_law.csv", index=False
+    current = (
+        pd.read_excel(
+            http_cache.fetch(INCOME_LEVELS_URL),
+            sheet_name="List of economies",
+            usecols=["Code", "Income group"],
         )
+        .dropna(subset=["Income group"])
+        .rename(columns={"Code": "iso_code", "Income group": "income_level"})
+        .assign(year=year)
+    )
+
+    path = datasets.raw_path("income_levels")
+    previous = pd.read_csv(path) if path.exists() else current.iloc[:0]
+
+    (
+        pd.concat([previous.loc[lambda d: d.year != year], current])
+        .sort_values(["year", "iso_code"])
+        .reset_index(drop=True)
+        .pipe(datasets.write_raw, "income_levels")
     )
-    logger.debug("Extracted law data from World Bank")
+    logger.debug("Extracted income levels from World Bank")
 
 
 # Extract UIS data
@@ -175,7 +485,7 @@ def uis_sdg() -> None:
         .load_data()
         .get_data()
         .loc[lambda d: d["INDICATOR_ID"].isin(indicators)]
-        .to_csv(PATHS.raw_data / "uis.csv", index=False)
+        .pipe(datasets.write_raw, "uis")
     )
     logger.debug("Extracted data from UIS")
 
@@ -185,15 +495,19 @@ def uis_sdg() -> None:
 MMR_URL = "https://mmr2020.srhr.org/download_mmr_estimates.zip"
 
 
-def _mmr2020_country_estimates() -> pd.DataFrame:
+def _mmr2020_country_estimates(archive: zipfile.ZipFile) -> pd.DataFrame:
     """Exract and clean country level estimates from mmr2020
 
+    Args:
+        archive (zipfile.ZipFile): open mmr2020 estimates archive
+
     Returns:
         pd.DataFrame -- country level estimates
     """
 
     path = "download_mmr_estimates/country_level_pub/estimates_country_level.csv"
-    df = read_zipped_csv(MMR_URL, path)
+    with archive.open(path) as f:
+        df = pd.read_csv(f)
 
     # clean
     df = (
@@ -208,18 +522,25 @@ def _mmr2020_country_estimates() -> pd.DataFrame:
         )
         .drop(columns="estimate_version")
         .assign(
-            country=lambda d: coco.convert(d.iso_code, to="name_short"),
-            continent=lambda d: coco.convert(d.iso_code, to="continent"),
+            country=lambda d: countries.convert(
+                d.iso_code, to="name_short", not_found="not found"
+            ),
+            continent=lambda d: countries.convert(
+                d.iso_code, to="continent", not_found="not found"
+            ),
         )
     )
 
     return df
 
 
-def _mmr2020_region_estimates(region_file: str) -> pd.DataFrame:
+def _mmr2020_region_estimates(
+    archive: zipfile.ZipFile, region_file: str
+) -> pd.DataFrame:
     """Extract and cleandata for specific region file
 
     Args:
+        archive (zipfile.ZipFile): open mmr2020 estimates archive
         region_file (str): name of region file
 
     Returns:
@@ -227,7 +548,8 @@ def _mmr2020_region_estimates(region_file: str) -> pd.DataFrame:
 
     """
 
-    df = read_zipped_csv(MMR_URL, region_file)
+    with archive.open(region_file) as f:
+        df = pd.read_csv(f)
 
     # clean
     df = df.rename(
@@ -247,31 +569,29 @@ def mmr2020() -> None:
     """Extract data from MMR2020 for country and region estimates
     save country estimates to mmr2020_country_estimates.csv
     save region estimates to mmr2020_region_estimates.csv
+
+    The archive is downloaded once, and each csv file is streamed from it
+    without being extracted to disk.
     """
 
-    _mmr2020_country_estimates().to_csv(
-        PATHS.raw_data / "mmr2020_country_estimates.csv", index=False
-    )
-    logger.debug("Extracted country estimates from MMR2020")
+    region_files = [
+        "download_mmr_estimates/aggregates_pub/estimates_World.csv",  # world
+        "download_mmr_estimates/aggregates_pub/estimates_sdg_region.csv",  # regions
+        "download_mmr_estimates/aggregates_pub/estimates_World_Bank_Income.csv",
+    ]
 
-    (
-        pd.concat(
-            [
-                _mmr2020_region_estimates(
-                    "download_mmr_estimates/aggregates_pub/estimates_World.csv"
-                ),
-                # world
-                _mmr2020_region_estimates(
-                    "download_mmr_estimates/aggregates_pub/estimates_sdg_region.csv"
-                ),
-                # regions
-                _mmr2020_region_estimates(
-                    "download_mmr_estimates/aggregates_pub/estimates_World_Bank_Income.csv"
-                ),  # sub regions
-            ]
-        ).to_csv(PATHS.raw_data / "mmr2020_region_estimates.csv", index=False)
-    )
-    logger.debug("Extracted region estimates from MMR2020")
+    with zipfile.ZipFile(http_cache.fetch(MMR_URL)) as archive:
+        _mmr2020_country_estimates(archive).pipe(
+            datasets.write_raw, "mmr2020_country_estimates"
+        )
+        logger.debug("Extracted country estimates from MMR2020")
+
+        (
+            pd.concat(
+                [_mmr2020_region_estimates(archive, file) for file in region_files]
+            ).pipe(datasets.write_raw, "mmr2020_region_estimates")
+        )
+        logger.debug("Extracted region estimates from MMR2020")
 
 
 # Extract ILO data
@@ -287,25 +607,44 @@ def ilo_employment() -> None:
         "EAP_DWAP_SEX_AGE_RT_A": "Labour force participation rate by sex and age (%)",
     }
 
-    (
-        ilo.ILO()
-        .load_data(list(indicators))
-        .get_data()
-        .to_csv(f"{PATHS.raw_data}/ilo.csv", index=False)
-    )
+    (ilo.ILO().load_data(list(indicators)).get_data().pipe(datasets.write_raw, "ilo"))
     logger.debug("Extracted data from ILO")
 
 
+SOURCES = [
+    runner.Source("hdr_gii", hdr_gii, host="hdr.undp.org"),
+    runner.Source("hdr_gdi", hdr_gdi, host="hdr.undp.org"),
+    runner.Source("world_bank", world_bank, host="api.worldbank.org"),
+    runner.Source("wb_income_levels", wb_income_levels, host="databank.worldbank.org"),
+    runner.Source("mmr2020", mmr2020, host="mmr2020.srhr.org"),
+    runner.Source("uis_sdg", uis_sdg, host="uis.unesco.org"),
+    # runner.Source("ilo_employment", ilo_employment, host="www.ilo.org"),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Extract raw data from all sources")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="request the full history of World Bank indicators, not only the "
+        "latest years",
+    )
+    args = parser.parse_args()
+
+    sources = [
+        source._replace(func=functools.partial(world_bank, full=True))
+        if args.full and source.func is world_bank
+        else source
+        for source in SOURCES
+    ]
+
+    runner.run(sources)
+
+
 if __name__ == "__main__":
     """Update raw data from all sources"""
 
-    hdr_gii()
-    hdr_gdi()
-    wb_wdi()
-    wb_law()
-    wb_gender()
-    mmr2020()
-    uis_sdg()
-    # ilo_employment()
+    main()
 
     logger.debug("Successfully extracted data from all sources to raw_data folder")
@@ -3,10 +3,14 @@ and UN Women's report on the impact of COVID-19 on women's poverty.
 link: https://data.unwomen.org/features/poverty-deepens-women-and-girls-according-latest-projections
 """
 
+from pathlib import Path
+
 import pandas as pd
-import country_converter as coco
+from pyarrow import ArrowException
 
+from scripts import countries, datasets, instrumentation
 from scripts.config import PATHS
+from scripts.extraction_tools import http_cache
 from scripts.logger import logger
 
 URL = "https://data.unwomen.org/sites/default/files/inline-files/Poverty-Estimates_new-release_210122.xlsx"
@@ -18,6 +22,45 @@ SHEETS = {
 }
 
 
+def read_workbook(workbook: Path) -> dict[str, pd.DataFrame]:
+    """Read all the sheets needed from the poverty workbook in a single pass
+
+    Parsed sheets are cached as parquet files, keyed on the content of the
+    workbook, so the workbook is only parsed again when it changes upstream.
+
+    Args:
+        workbook: path to the workbook, as returned by the download cache
+
+    Returns:
+        dictionary with the keys of SHEETS and the parsed sheets as values
+    """
+
+    # files in the download cache are named after the hash of their content
+    cache_dir = PATHS.cache / "poverty_workbook" / workbook.name
+
+    if all((cache_dir / f"{key}.parquet").exists() for key in SHEETS):
+        # parquet only stores string column names, so years are restored to int
+        return {
+            key: pd.read_parquet(cache_dir / f"{key}.parquet").rename(
+                columns=lambda c: int(c) if c.isdigit() else c
+            )
+            for key in SHEETS
+        }
+
+    sheets = pd.read_excel(workbook, sheet_name=list(SHEETS.values()))
+    sheets = {key: sheets[sheet] for key, sheet in SHEETS.items()}
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for key, df in sheets.items():
+        try:
+            with datasets.atomic_path(cache_dir / f"{key}.parquet") as path:
+                df.rename(columns=str).to_parquet(path)
+        except (ArrowException, ValueError):
+            logger.debug(f"Could not cache sheet {SHEETS[key]} as parquet")
+
+    return sheets
+
+
 def get_mapper(df: pd.DataFrame) -> dict:
     """Get a mapper from the variables sheet to map variable names and units
 
@@ -47,6 +90,7 @@ def get_mapper(df: pd.DataFrame) -> dict:
     }
 
 
+@instrumentation.profiled
 def clean_country_data(df: pd.DataFrame, mapper: dict) -> pd.DataFrame:
     """Clean country data dataframe
 
@@ -68,7 +112,11 @@ def clean_country_data(df: pd.DataFrame, mapper: dict) -> pd.DataFrame:
             variable_name=lambda d: d.variable_code.map(mapper["variable_name"]),
             units=lambda d: d.variable_code.map(mapper["units"]),
         )
-        .assign(region_name=lambda d: coco.convert(d.iso_code, to="name_short"))
+        .assign(
+            region_name=lambda d: countries.convert(
+                d.iso_code, to="name_short", not_found="not found"
+            )
+        )
         .melt(
             id_vars=list(cols.values()) + ["variable_name", "units", "region_name"],
             var_name="year",
@@ -76,6 +124,7 @@ def clean_country_data(df: pd.DataFrame, mapper: dict) -> pd.DataFrame:
     )
 
 
+@instrumentation.profiled
 def clean_region_data(df: pd.DataFrame, mapper: dict) -> pd.DataFrame:
     """Clean regional data dataframe
 
@@ -100,15 +149,18 @@ def clean_region_data(df: pd.DataFrame, mapper: dict) -> pd.DataFrame:
     )
 
 
+@instrumentation.profiled(name="extract.poverty")
 def update_poverty_data() -> None:
     """Pipeline to update UNwomen, Pardee poverty data
 
     Stored as a csv in raw_data/unwomen_pardee_poverty.csv
     """
 
-    mapper = pd.read_excel(URL, sheet_name=SHEETS["variables"]).pipe(get_mapper)
-    df_region = pd.read_excel(URL, sheet_name=SHEETS["regional_data"])
-    df_country = pd.read_excel(URL, sheet_name=SHEETS["country_data"])
+    sheets = read_workbook(http_cache.fetch(URL))
+
+    mapper = get_mapper(sheets["variables"])
+    df_region = sheets["regional_data"]
+    df_country = sheets["country_data"]
 
     (
         pd.concat(
@@ -117,7 +169,7 @@ def update_poverty_data() -> None:
                 clean_country_data(df_country, mapper),
             ],
             ignore_index=True,
-        ).to_csv(PATHS.raw_data / "unwomen_pardee_poverty.csv", index=False)
+        ).pipe(datasets.write_raw, "unwomen_pardee_poverty")
     )
     logger.info("Updated unwomen_pardee_poverty.csv")
 
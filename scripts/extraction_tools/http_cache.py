@@ -0,0 +1,387 @@
+"""Persistent on-disk cache for files downloaded by the extraction tools.
+
+Response bodies are stored by the sha256 of their content, along with the
+ETag and Last-Modified headers sent by the server. When a url is requested
+again, the cache sends a conditional request, so a file that has not changed
+upstream costs a 304 response instead of a full download.
+
+Downloads are streamed in chunks to a partial file, which is only moved into
+the cache once it is complete and its size (and checksum, if one is given)
+has been checked. If the connection drops, the download is resumed from the
+end of the partial file with an HTTP Range request, including in a later run.
+
+The network is accessed through a transport object, which can be replaced
+(for example by one pointing to a local server) to run without network access.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, NamedTuple, Protocol
+
+import requests
+
+from scripts import telemetry
+from scripts.config import PATHS
+from scripts.logger import logger
+
+CHUNK_SIZE = 1024 * 1024
+
+# errors raised by a transport when a connection drops during a download
+DROPPED = (requests.RequestException, ConnectionError)
+
+
+class Response(NamedTuple):
+    """Response returned by a transport"""
+
+    status: int
+    headers: dict
+    body: Iterator[bytes]
+
+
+class Transport(Protocol):
+    """Object used by the cache to make GET requests"""
+
+    def get(self, url: str, headers: dict) -> Response:
+        ...
+
+
+class RequestsTransport:
+    """Transport making requests over the network with `requests`"""
+
+    def __init__(self, timeout: float = 120):
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get(self, url: str, headers: dict) -> Response:
+        # Content-Length and byte ranges count the bytes sent, while the body
+        # is decompressed, so ask for the file as it is
+        response = self.session.get(
+            url,
+            headers={"Accept-Encoding": "identity", **headers},
+            stream=True,
+            timeout=self.timeout,
+        )
+
+        return Response(
+            status=response.status_code,
+            headers=dict(response.headers),
+            body=response.iter_content(CHUNK_SIZE),
+        )
+
+
+def _content_range(value: str) -> tuple[int, int | None]:
+    """Return the first byte and total size from a Content-Range header,
+    e.g. "bytes 100-999/1000". The total is None if the server sent "*"."""
+
+    first, total = value.removeprefix("bytes ").replace("-", "/").split("/")[::2]
+
+    return int(first), None if total == "*" else int(total)
+
+
+class HttpCache:
+    """Content addressed cache of downloaded files
+
+    Args:
+        directory: folder where the cached files and index are stored
+        transport: object used to make requests. Defaults to RequestsTransport
+        retries: number of times a dropped download is resumed before giving up
+    """
+
+    def __init__(
+        self,
+        directory: os.PathLike = PATHS.http_cache,
+        transport: Transport = None,
+        retries: int = 3,
+    ):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.partial = self.directory / "partial"
+        self.index_path = self.directory / "index.json"
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.retries = retries
+
+        # urls already checked against the server in this process
+        self._validated = set()
+        self._lock = threading.Lock()
+
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.partial.mkdir(parents=True, exist_ok=True)
+
+    def _read_index(self) -> dict:
+        if not self.index_path.exists():
+            return {}
+
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def _write_index(self, index: dict) -> None:
+        """Write the index atomically, so an interrupted run can't corrupt it"""
+
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.directory, delete=False, suffix=".tmp"
+        ) as f:
+            json.dump(index, f, indent=2)
+
+        os.replace(f.name, self.index_path)
+
+    def _partial_paths(self, url: str) -> tuple[Path, Path]:
+        """Return the paths of the partial download of a url and of its headers"""
+
+        key = hashlib.sha256(url.encode()).hexdigest()
+
+        return self.partial / key, self.partial / f"{key}.json"
+
+    def _resume_headers(self, url: str) -> dict:
+        """Return the headers to resume a partial download of a url, if any
+
+        A download is only resumed if the server identified the file with an
+        ETag or Last-Modified header, and did not compress it. If-Range makes
+        the server send the whole file again if it changed since.
+        """
+
+        data, meta = self._partial_paths(url)
+        if not data.exists() or not meta.exists():
+            return {}
+
+        with open(meta) as f:
+            headers = json.load(f)
+
+        validator = headers.get("etag") or headers.get("last_modified")
+        if validator is None or headers.get("encoded"):
+            return {}
+
+        return {"Range": f"bytes={data.stat().st_size}-", "If-Range": validator}
+
+    def _complete_partial(self, url: str) -> dict | None:
+        """Return the headers of the partial download of a url if it is
+        already complete, e.g. when a run stopped before moving it to the
+        objects folder. A Range request for it would get a 416 response."""
+
+        data, meta = self._partial_paths(url)
+        if not data.exists() or not meta.exists():
+            return None
+
+        with open(meta) as f:
+            headers = json.load(f)
+
+        if headers.get("size") is None or data.stat().st_size != headers["size"]:
+            return None
+
+        return headers
+
+    def _discard_partial(self, url: str) -> None:
+        """Delete the partial download of a url and its headers"""
+
+        for path in self._partial_paths(url):
+            path.unlink(missing_ok=True)
+
+    def _update_index(self, url: str, entry: dict) -> None:
+        with self._lock:
+            index = self._read_index()
+            index[url] = entry
+            self._write_index(index)
+
+    def _download(self, url: str, response: Response, sha256: str | None) -> dict:
+        """Stream a response to the partial file of a url, resuming it if the
+        connection drops, and move it to the objects folder once complete
+
+        Args:
+            url: url of the file
+            response: response to a GET request, with status 200 or 206
+            sha256: optional expected sha256 of the content
+
+        Returns:
+            the index entry of the downloaded file
+
+        Raises:
+            ConnectionError: if the download is still incomplete after all
+                retries, or the server sent an unexpected response
+            ValueError: if the downloaded file does not have the expected sha256
+        """
+
+        data, meta = self._partial_paths(url)
+        received = 0
+
+        for attempt in range(self.retries + 1):
+            response_headers = {k.lower(): v for k, v in response.headers.items()}
+
+            if response.status == 206:
+                first, _ = _content_range(response_headers["content-range"])
+                if first != data.stat().st_size:
+                    self._discard_partial(url)
+                    raise ConnectionError(f"Unexpected range from {url}: {first}-")
+                with open(meta) as f:
+                    headers = json.load(f)
+                mode = "ab"
+
+            elif response.status == 200:
+                # the size of a compressed body is not the size of the file
+                total = response_headers.get("content-length")
+                encoded = response_headers.get("content-encoding", "identity")
+                encoded = encoded.lower() != "identity"
+                headers = {
+                    "etag": response_headers.get("etag"),
+                    "last_modified": response_headers.get("last-modified"),
+                    "size": int(total) if total is not None and not encoded else None,
+                    "encoded": encoded,
+                }
+                with open(meta, "w") as f:
+                    json.dump(headers, f)
+                mode = "wb"
+
+            else:
+                raise ConnectionError(f"Could not resume {url}: HTTP {response.status}")
+
+            try:
+                with open(data, mode) as f:
+                    for chunk in response.body:
+                        f.write(chunk)
+                        received += len(chunk)
+            except DROPPED as error:
+                logger.debug(f"Download of {url} dropped: {error!r}")
+            else:
+                if headers["size"] is None or data.stat().st_size >= headers["size"]:
+                    break
+
+            if attempt == self.retries:
+                telemetry.count(bytes_downloaded=received)
+                raise ConnectionError(f"Download of {url} is incomplete")
+
+            logger.debug(f"Resuming {url} from byte {data.stat().st_size}")
+            response = self.transport.get(url, self._resume_headers(url))
+
+        telemetry.count(bytes_downloaded=received)
+
+        return self._finalise(url, headers, sha256)
+
+    def _finalise(self, url: str, headers: dict, sha256: str | None) -> dict:
+        """Check the partial download of a url and move it to the objects folder
+
+        Args:
+            url: url of the file
+            headers: headers of the partial download, as saved with it
+            sha256: optional expected sha256 of the content
+
+        Returns:
+            the index entry of the downloaded file
+
+        Raises:
+            ConnectionError: if the file does not have the size sent by the server
+            ValueError: if the file does not have the expected sha256
+        """
+
+        data, meta = self._partial_paths(url)
+
+        size = data.stat().st_size
+        if headers["size"] is not None and size != headers["size"]:
+            self._discard_partial(url)
+            raise ConnectionError(f"Got {size} of {headers['size']} bytes from {url}")
+
+        digest = hashlib.sha256()
+        with open(data, "rb") as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(block)
+
+        if sha256 is not None and digest.hexdigest() != sha256:
+            self._discard_partial(url)
+            raise ValueError(f"Checksum of {url} does not match: {digest.hexdigest()}")
+
+        os.replace(data, self.objects / digest.hexdigest())
+        meta.unlink()
+        logger.debug(f"Downloaded {size} bytes from {url}")
+
+        return {
+            "sha256": digest.hexdigest(),
+            "size": size,
+            "etag": headers["etag"],
+            "last_modified": headers["last_modified"],
+        }
+
+    def fetch(self, url: str, sha256: str | None = None) -> Path:
+        """Return the path to a local copy of a url, downloading it if it changed
+
+        A download interrupted in a previous run is resumed.
+
+        Args:
+            url: url of the file
+            sha256: optional expected sha256 of the content. A downloaded file
+                which does not match it is discarded.
+
+        Returns:
+            path to the cached file. The file must not be modified.
+
+        Raises:
+            ConnectionError: if the file could not be downloaded
+            ValueError: if the downloaded file does not have the expected sha256
+        """
+
+        index = self._read_index()
+        entry = index.get(url)
+
+        if entry is not None and not (self.objects / entry["sha256"]).exists():
+            entry = None
+
+        # a download finished by a run which stopped before moving it is
+        # finalised, then revalidated like any cached file
+        partial = self._complete_partial(url) if entry is None else None
+        if partial is not None:
+            logger.debug(f"Using the complete partial download of {url}")
+            entry = self._finalise(url, partial, sha256)
+            self._update_index(url, entry)
+
+        if entry is not None and url in self._validated:
+            return self.objects / entry["sha256"]
+
+        headers = {}
+        if entry is not None and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        if entry is None:
+            headers = self._resume_headers(url)
+
+        response = self.transport.get(url, headers)
+
+        if response.status == 416 and "Range" in headers:
+            # the partial download does not match the file on the server
+            logger.debug(f"Range not satisfiable, downloading {url} again")
+            self._discard_partial(url)
+            headers = {}
+            response = self.transport.get(url, headers)
+
+        if response.status == 304 and entry is not None:
+            logger.debug(f"Not modified, using cached copy of {url}")
+
+        elif response.status in (200, 206):
+            entry = self._download(url, response, sha256)
+            self._update_index(url, entry)
+
+        else:
+            raise ConnectionError(f"Could not download {url}: HTTP {response.status}")
+
+        if sha256 is not None and entry["sha256"] != sha256:
+            raise ValueError(f"Checksum of {url} does not match: {entry['sha256']}")
+
+        self._validated.add(url)
+
+        return self.objects / entry["sha256"]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def fetch(url: str, sha256: str | None = None) -> Path:
+    """Return the path to a local copy of a url, using the shared cache"""
+
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+
+    return _default_cache.fetch(url, sha256)
@@ -0,0 +1,116 @@
+"""Run extraction functions concurrently.
+
+Each source is dominated by network latency to its provider, so sources run
+in a thread pool. The number of sources hitting the same host at once is
+capped, failed sources are retried with exponential backoff, and the time
+taken by each source is logged.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple
+
+from scripts import instrumentation, telemetry
+from scripts.logger import logger
+
+
+class Source(NamedTuple):
+    """An extraction function and the host it downloads data from"""
+
+    name: str
+    func: Callable[[], None]
+    host: str
+
+
+def _run_source(
+    source: Source,
+    host_slots: threading.BoundedSemaphore,
+    retries: int,
+    backoff: float,
+) -> float:
+    """Run a single source, retrying on failure
+
+    Returns:
+        the time taken by the successful attempt, in seconds
+    """
+
+    for attempt in range(retries + 1):
+        with host_slots:
+            start = time.perf_counter()
+            try:
+                with telemetry.meter(source.name):
+                    with instrumentation.profile(f"extract.{source.name}"):
+                        source.func()
+                return time.perf_counter() - start
+            except Exception as error:
+                if attempt == retries:
+                    raise
+                wait = backoff * 2**attempt
+                logger.info(
+                    f"{source.name} failed ({error!r}), retrying in {wait:.0f}s"
+                )
+
+        time.sleep(wait)
+
+
+def run(
+    sources: list[Source],
+    max_workers: int | None = None,
+    per_host: int = 2,
+    retries: int = 2,
+    backoff: float = 10,
+) -> dict[str, float]:
+    """Run extraction sources concurrently
+
+    Sources write their own raw files (atomically), so a source that fails
+    leaves the previous version of its files untouched.
+
+    Args:
+        sources: list of sources to run
+        max_workers: maximum number of sources running at once.
+            Defaults to the number of sources.
+        per_host: maximum number of sources running at once against the same host
+        retries: number of times a failed source is retried
+        backoff: seconds to wait before the first retry. The wait doubles
+            on each retry.
+
+    Returns:
+        dictionary with the time taken by each source, in seconds
+
+    Raises:
+        RuntimeError: if any source still fails after all retries. Every other
+            source is run to completion first.
+    """
+
+    host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+    for source in sources:
+        host_slots[source.host]  # create every semaphore before starting threads
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(sources)) as executor:
+        futures = {
+            source.name: executor.submit(
+                _run_source, source, host_slots[source.host], retries, backoff
+            )
+            for source in sources
+        }
+
+    timings, failed = {}, []
+    for name, future in futures.items():
+        if future.exception() is not None:
+            logger.error(f"Failed to extract {name}: {future.exception()!r}")
+            failed.append(name)
+        else:
+            timings[name] = future.result()
+            logger.info(f"Extracted {name} in {timings[name]:.1f}s")
+
+    telemetry.record(
+        "extract",
+        {name: {"seconds": t, **telemetry.usage(name)} for name, t in timings.items()},
+    )
+
+    if failed:
+        raise RuntimeError(f"Extraction failed for: {', '.join(failed)}")
+
+    return timings
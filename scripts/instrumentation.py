@@ -0,0 +1,394 @@
+"""Timing, memory and row count instrumentation of charts and extraction steps.
+
+Instrumentation is off unless the DATADIVE_PROFILE environment variable is set
+(to anything but "0"), or `enable()` is called. When off, instrumented
+functions and blocks only pay for a check of a flag.
+
+When on, every `profile` block (or `profiled` function) records:
+- its wall time and CPU time (of the thread it runs in)
+- the peak memory allocated by Python during the block, from tracemalloc,
+  and the peak resident memory of the process so far
+- the rows it read from `datasets` and the rows it wrote to csv files. Rows
+  of dataframes passed to, or returned by, a `profiled` function are counted
+  too.
+
+Each `DataFrame.pipe` step run inside a block is recorded as a stage of it,
+so long method chains are broken down step by step. tracemalloc slows code
+down, so times are only comparable between runs that are both profiled.
+
+`DataFrame.pipe`, `DataFrame.to_csv` and the `datasets` readers are only
+replaced while a block is open in some thread, and restored when the last
+open block ends, even if it fails. Code running outside of blocks always
+uses the original functions.
+
+Records are logged, and appended as json lines to .logs/profile.jsonl with an
+id of the run, so that they can be loaded with `pd.read_json(lines=True)`.
+Memory peaks of blocks running in different threads at the same time (e.g.
+extraction sources) overlap.
+
+Usage:
+    DATADIVE_PROFILE=1 python scripts/charts/update_charts.py
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterator
+
+import pandas as pd
+
+from scripts import datasets
+from scripts.config import PATHS
+from scripts.logger import logger
+
+REPORT = PATHS.logs / "profile.jsonl"
+
+# id shared by every record of a run, including records of forked workers
+RUN_ID = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+
+_enabled = False
+
+# state of each thread: its open blocks (innermost last), its records not yet
+# written to the report, and whether it is reading a dataset
+_local = threading.local()
+
+# methods and functions replaced while a block is open
+_originals: dict = {}
+
+# number of top level blocks open in all threads
+_open_blocks = 0
+_patch_lock = threading.Lock()
+
+
+class _Block:
+    """Measurements of a block that is running"""
+
+    def __init__(self, name: str, parent: "_Block | None"):
+        self.name = name
+        self.parent = parent
+        self.rows_in = 0
+        self.rows_out = 0
+        self.started = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.memory_start, self.memory_peak = tracemalloc.get_traced_memory()
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+
+def _stack() -> list[_Block]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+
+    return _local.stack
+
+
+def _max_rss_mb() -> float | None:
+    """Return the peak resident memory of the process, in MB"""
+
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+@contextmanager
+def profile(name: str) -> Iterator[_Block | None]:
+    """Record the time, memory and rows of a block of code
+
+    Args:
+        name: name of the block in the report, e.g. the name of a chart
+
+    Yields:
+        the measurements of the block, or None if instrumentation is off
+    """
+
+    if not _enabled:
+        yield None
+    elif _stack():
+        with _profile(name) as block:
+            yield block
+    else:
+        with _instrumented(), _profile(name) as block:
+            yield block
+
+
+@contextmanager
+def _profile(name: str) -> Iterator[_Block]:
+    """Measure a block, nested in the open block of the thread if any"""
+
+    stack = _stack()
+
+    # tracemalloc has a single peak, which is reset for each block. The peak
+    # reached so far is kept by the enclosing block first.
+    if stack:
+        stack[-1].memory_peak = max(
+            stack[-1].memory_peak, tracemalloc.get_traced_memory()[1]
+        )
+    tracemalloc.reset_peak()
+
+    block = _Block(name, stack[-1] if stack else None)
+    stack.append(block)
+
+    try:
+        yield block
+    finally:
+        wall = time.perf_counter() - block.wall
+        cpu = time.thread_time() - block.cpu
+        block.memory_peak = max(block.memory_peak, tracemalloc.get_traced_memory()[1])
+        stack.pop()
+
+        if block.parent is not None:
+            block.parent.memory_peak = max(block.parent.memory_peak, block.memory_peak)
+
+        _record(
+            {
+                "run": RUN_ID,
+                "pid": os.getpid(),
+                "name": block.name,
+                "parent": block.parent.name if block.parent is not None else None,
+                "depth": len(stack),
+                "started": block.started,
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "peak_mb": round((block.memory_peak - block.memory_start) / 1e6, 3),
+                "max_rss_mb": _max_rss_mb(),
+                "rows_in": block.rows_in,
+                "rows_out": block.rows_out,
+            }
+        )
+
+
+def _pending() -> list[dict]:
+    """Return the records of the current thread not yet written to the report"""
+
+    if not hasattr(_local, "pending"):
+        _local.pending = []
+
+    return _local.pending
+
+
+def _record(record: dict) -> None:
+    """Keep a record, and write all kept records when a top level block ends
+
+    Records are written in a single append, so that worker processes can
+    share the report.
+    """
+
+    pending = _pending()
+    pending.append(record)
+
+    if record["depth"] > 0:
+        return
+
+    logger.info(
+        f"{record['name']}: {record['wall_s']:.2f}s wall, "
+        f"{record['cpu_s']:.2f}s cpu, {record['peak_mb']:.1f}MB peak, "
+        f"{record['rows_in']} rows in, {record['rows_out']} rows out"
+    )
+
+    REPORT.parent.mkdir(parents=True, exist_ok=True)
+    with open(REPORT, "a") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in pending))
+    pending.clear()
+
+
+def _count(rows: int, direction: str) -> None:
+    """Add rows read or written to every open block of the current thread"""
+
+    for block in _stack():
+        setattr(block, direction, getattr(block, direction) + rows)
+
+
+def _rows(value) -> int:
+    return len(value) if isinstance(value, pd.DataFrame) else 0
+
+
+def profiled(func: Callable = None, *, name: str | None = None) -> Callable:
+    """Decorator to record every call of a function as a `profile` block
+
+    Rows of the dataframes passed to the function count as rows in, and rows
+    of a dataframe it returns as rows out.
+
+    Args:
+        func: function to instrument
+        name: name of the function in the report. Defaults to the name of
+            its module and function, e.g. "extract_poverty.clean_region_data".
+    """
+
+    if func is None:
+        return functools.partial(profiled, name=name)
+
+    block_name = name or f"{func.__module__.split('.')[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+
+        with profile(block_name) as block:
+            block.rows_in += sum(_rows(a) for a in [*args, *kwargs.values()])
+            result = func(*args, **kwargs)
+            block.rows_out += _rows(result)
+
+        return result
+
+    return wrapper
+
+
+def _pipe(self, func, *args, **kwargs):
+    """DataFrame.pipe, with each step recorded as a stage of the open block.
+    The rows of the dataframe piped in, and of the result, are counted."""
+
+    if not _stack():
+        return _originals["pipe"](self, func, *args, **kwargs)
+
+    step = func[0] if isinstance(func, tuple) else func
+    with profile(getattr(step, "__name__", repr(step))) as block:
+        block.rows_in += len(self)
+        result = _originals["pipe"](self, func, *args, **kwargs)
+        block.rows_out += _rows(result)
+
+    return result
+
+
+def _to_csv(self, *args, **kwargs):
+    """DataFrame.to_csv, counting the rows written"""
+
+    _count(len(self), "rows_out")
+
+    return _originals["to_csv"](self, *args, **kwargs)
+
+
+def _read(func: Callable) -> Callable:
+    """Wrap a datasets function to count the rows it returns
+
+    Reads made by another read (e.g. loading a dataset to build its Store)
+    are not counted again.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_local, "reading", False):
+            return func(*args, **kwargs)
+
+        _local.reading = True
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _local.reading = False
+
+        _count(_rows(result), "rows_in")
+
+        return result
+
+    # keep the cache_clear of cached functions, used by datasets.clear_cache
+    if hasattr(func, "cache_clear"):
+        wrapper.cache_clear = func.cache_clear
+
+    return wrapper
+
+
+# functions of the datasets module whose results are counted as rows read
+_READS = ["load", "query", "store", "afrobarometer"]
+
+
+def _patch() -> None:
+    """Replace pipe, to_csv and the datasets readers by instrumented versions"""
+
+    _originals["pipe"] = pd.DataFrame.pipe
+    _originals["to_csv"] = pd.DataFrame.to_csv
+    _originals["get"] = datasets.Store.get
+    _originals.update({f: getattr(datasets, f) for f in _READS})
+
+    pd.DataFrame.pipe = _pipe
+    pd.DataFrame.to_csv = _to_csv
+    datasets.Store.get = _read(_originals["get"])
+    for f in _READS:
+        setattr(datasets, f, _read(_originals[f]))
+
+
+def _unpatch() -> None:
+    """Restore the functions replaced by `_patch`"""
+
+    pd.DataFrame.pipe = _originals["pipe"]
+    pd.DataFrame.to_csv = _originals["to_csv"]
+    datasets.Store.get = _originals["get"]
+    for f in _READS:
+        setattr(datasets, f, _originals[f])
+
+
+@contextmanager
+def _instrumented() -> Iterator[None]:
+    """Keep the instrumented functions in place while a top level block runs
+
+    Blocks of different threads share the replaced functions, which are
+    restored when the last of them ends.
+    """
+
+    global _open_blocks
+
+    with _patch_lock:
+        if _open_blocks == 0:
+            _patch()
+        _open_blocks += 1
+
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _open_blocks -= 1
+            if _open_blocks == 0:
+                _unpatch()
+
+
+def enable() -> None:
+    """Turn instrumentation on"""
+
+    global _enabled
+
+    if _enabled:
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    _enabled = True
+
+
+def disable() -> None:
+    """Turn instrumentation off. Blocks already open are still recorded."""
+
+    global _enabled
+
+    if not _enabled:
+        return
+
+    tracemalloc.stop()
+    _enabled = False
+
+
+def report(run: str | None = None) -> pd.DataFrame:
+    """Return the records of a run from the report
+
+    Args:
+        run: id of the run. Defaults to the latest run.
+
+    Returns:
+        dataframe with a row per block and stage
+    """
+
+    records = pd.read_json(REPORT, lines=True, dtype={"run": str})
+    run = run if run is not None else records["run"].iloc[-1]
+
+    return records.loc[lambda d: d.run == run].reset_index(drop=True)
+
+
+if os.environ.get("DATADIVE_PROFILE", "0") != "0":
+    enable()
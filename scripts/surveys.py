@@ -0,0 +1,113 @@
+"""Weighted cross tabulation of survey questions.
+
+Survey data is kept as integer codes. Questions are cross tabulated by
+stacking their answers into a single long frame, so the shares of every
+question, breakdown group and response are computed in one groupby.
+"""
+
+from typing import Callable, NamedTuple
+
+import pandas as pd
+
+
+class Question(NamedTuple):
+    """A survey question to cross tabulate
+
+    Args:
+        variable: name of the survey variable, e.g. "Q16"
+        responses: labels of the responses to count, mapped to the names used
+            in the output, in the order they should be shown. Other responses
+            are ignored.
+        negative: names of the responses whose shares are made negative, e.g.
+            to draw disagreement to the left of a diverging bar chart
+    """
+
+    variable: str
+    responses: dict[str, str]
+    negative: tuple[str, ...] = ()
+
+
+def crosstab(
+    df: pd.DataFrame,
+    questions: list[Question],
+    by: str,
+    breakdown: str,
+    groups: dict[str, str],
+    labels: Callable[[str], dict],
+    weight: str | None = None,
+    total: str = "all",
+) -> pd.DataFrame:
+    """Compute the share of each response to questions, by group
+
+    Shares are the percentage of the (weighted) respondents of a `by` value and
+    breakdown group who gave each response, out of those who gave one of the
+    responses of the question.
+
+    Args:
+        df: survey data, with integer codes for the `by`, `breakdown` and
+            question variables
+        questions: questions to cross tabulate
+        by: variable shares are computed within, e.g. "COUNTRY"
+        breakdown: variable splitting respondents into groups, e.g. "Q101"
+        groups: labels of the breakdown groups to report, mapped to their names
+            in the output
+        labels: function returning the labels of the codes of a variable
+        weight: optional variable with the weight of each respondent. If None,
+            every respondent counts once.
+        total: name of the group with all respondents, whatever their
+            breakdown value (including values not in `groups`)
+
+    Returns:
+        long dataframe with the columns "question", `by`, `breakdown`,
+        "response" and "share". Shares are percentages, NaN for groups with no
+        respondents.
+    """
+
+    responses = pd.DataFrame(
+        [
+            (question.variable, float(code), question.responses[label])
+            for question in questions
+            for code, label in labels(question.variable).items()
+            if label in question.responses
+        ],
+        columns=["question", "code", "response"],
+    )
+
+    counts = (
+        df.assign(
+            **{
+                by: lambda d: d[by].map(labels(by)),
+                breakdown: lambda d: d[breakdown].map(labels(breakdown)),
+            },
+            _weight=lambda d: d[weight] if weight is not None else 1.0,
+        )
+        .melt(
+            id_vars=[by, breakdown, "_weight"],
+            value_vars=[question.variable for question in questions],
+            var_name="question",
+            value_name="code",
+        )
+        .astype({"code": "float64"})
+        .merge(responses, on=["question", "code"])
+        .groupby(["question", by, "response", breakdown])["_weight"]
+        .sum()
+        .unstack(breakdown, fill_value=0)
+    )
+
+    counts[total] = counts.sum(axis=1)
+    counts = counts.reindex(columns=list(groups) + [total], fill_value=0).rename(
+        columns=groups
+    )
+
+    shares = counts / counts.groupby(level=["question", by]).transform("sum") * 100
+
+    negative = [(q.variable, name) for q in questions for name in q.negative]
+    sign = shares.index.droplevel(by).isin(negative)
+    shares.loc[sign] = shares.loc[sign] * -1
+
+    return (
+        shares.rename_axis(columns=breakdown)
+        .stack(dropna=False)
+        .reset_index(name="share")
+        .loc[:, ["question", by, breakdown, "response", "share"]]
+    )
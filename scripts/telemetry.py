@@ -0,0 +1,290 @@
+"""History of the time taken and data handled by each run of the pipelines.
+
+Each run of update_charts.py and extract_data.py appends a row per chart or
+source to a SQLite database in .logs: the time it took, the bytes it
+downloaded, and the rows it read and wrote. The report compares the latest
+run of a pipeline with the median of the runs before it, and flags charts and
+sources that got slower or handle much more data. Growth of the upstream data
+(e.g. WDI adding years) then shows up before the monthly job times out.
+
+Usage:
+    python scripts/telemetry.py [--pipeline charts] [--slower 25] [--larger 50]
+"""
+
+import argparse
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+
+import pandas as pd
+
+from scripts.config import PATHS
+from scripts.logger import logger
+
+DATABASE = PATHS.logs / "telemetry.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run INTEGER PRIMARY KEY AUTOINCREMENT,
+    pipeline TEXT NOT NULL,
+    started TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run INTEGER NOT NULL REFERENCES runs (run),
+    name TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    bytes_downloaded INTEGER,
+    rows_in INTEGER,
+    rows_out INTEGER
+);
+"""
+
+# measures of the data handled by a step, as opposed to its time
+DATA_COLUMNS = ["bytes_downloaded", "rows_in", "rows_out"]
+
+# bytes and rows counted for each step while it runs, by step name
+_usage: dict[str, Counter] = defaultdict(Counter)
+_usage_lock = threading.Lock()
+
+# name of the step running in each thread
+_local = threading.local()
+
+
+@contextmanager
+def meter(name: str) -> Iterator[None]:
+    """Count the bytes and rows handled by a step while it runs
+
+    Counts made in the thread running the step with `count` are added to it.
+    Counts from a previous run of the step in this process are dropped.
+
+    Args:
+        name: name of the step, e.g. the name of an extraction source
+    """
+
+    with _usage_lock:
+        _usage[name] = Counter()
+
+    _local.step = name
+    try:
+        yield
+    finally:
+        _local.step = None
+
+
+def count(**amounts: int) -> None:
+    """Add amounts, e.g. bytes_downloaded=1024, to the step running in this
+    thread. Does nothing outside of a `meter` block."""
+
+    step = getattr(_local, "step", None)
+    if step is None:
+        return
+
+    with _usage_lock:
+        _usage[step].update(amounts)
+
+
+def usage(name: str) -> dict[str, int]:
+    """Return the amounts counted for a step"""
+
+    with _usage_lock:
+        return dict(_usage[name])
+
+
+def _connect() -> sqlite3.Connection:
+    DATABASE.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(DATABASE)
+    connection.executescript(SCHEMA)
+
+    return connection
+
+
+def record(pipeline: str, steps: dict[str, dict]) -> None:
+    """Store a run of a pipeline
+
+    Args:
+        pipeline: name of the pipeline, e.g. "charts" or "extract"
+        steps: dictionary of step name: measures of the step, with "seconds"
+            and optionally the keys of DATA_COLUMNS
+    """
+
+    if not steps:
+        return
+
+    started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    with closing(_connect()) as connection, connection:
+        run = connection.execute(
+            "INSERT INTO runs (pipeline, started) VALUES (?, ?)", (pipeline, started)
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (run, name, measures["seconds"])
+                + tuple(measures.get(column) for column in DATA_COLUMNS)
+                for name, measures in steps.items()
+            ],
+        )
+
+
+def history(pipeline: str) -> pd.DataFrame:
+    """Return every step of every run of a pipeline
+
+    Returns:
+        dataframe with the columns of the steps table and the start time of
+        each run, sorted by run
+    """
+
+    if not DATABASE.exists():
+        return pd.DataFrame(
+            columns=["run", "started", "name", "seconds"] + DATA_COLUMNS
+        )
+
+    with closing(_connect()) as connection:
+        return pd.read_sql_query(
+            "SELECT run, started, name, seconds, bytes_downloaded, rows_in, rows_out"
+            " FROM steps JOIN runs USING (run) WHERE pipeline = ? ORDER BY run",
+            connection,
+            params=(pipeline,),
+        ).astype({column: "float64" for column in ["seconds"] + DATA_COLUMNS})
+
+
+def _change(latest: pd.Series, baseline: pd.Series) -> pd.Series:
+    """Return the change from baseline to latest, in percent. NaN where there
+    is no baseline, or it is 0."""
+
+    return (latest / baseline.where(baseline > 0) - 1) * 100
+
+
+def report(
+    pipeline: str,
+    baseline: int = 5,
+    slower: float = 25,
+    larger: float = 50,
+    min_seconds: float = 1,
+) -> pd.DataFrame:
+    """Compare the latest run of a pipeline with the runs before it
+
+    Args:
+        pipeline: name of the pipeline
+        baseline: number of previous runs of each step to compare with. Their
+            median is used, so a single unusual run does not hide a regression.
+        slower: flag steps more than this percentage slower than the baseline
+        larger: flag steps which downloaded, read or wrote more than this
+            percentage more than the baseline
+        min_seconds: only flag steps at least this many seconds slower than
+            the baseline, as smaller differences are mostly noise
+
+    Returns:
+        dataframe with a row per step of the latest run: its time, the
+        baseline time and the change in percent, the largest change of the
+        data measures, and a "flag" column listing the problems found
+    """
+
+    steps = history(pipeline)
+    if steps.empty:
+        return steps
+
+    latest_run = steps["run"].max()
+    latest = steps.loc[lambda d: d.run == latest_run].set_index("name")
+
+    medians = (
+        steps.loc[lambda d: d.run < latest_run]
+        .groupby("name")
+        .tail(baseline)
+        .groupby("name")[["seconds"] + DATA_COLUMNS]
+        .median()
+        .reindex(latest.index)
+    )
+
+    data_change = pd.concat(
+        [_change(latest[c], medians[c]) for c in DATA_COLUMNS], axis=1
+    ).max(axis=1)
+
+    return (
+        pd.DataFrame(
+            {
+                "seconds": latest["seconds"],
+                "baseline_seconds": medians["seconds"],
+                "seconds_change": _change(latest["seconds"], medians["seconds"]),
+                "data_change": data_change,
+            }
+        )
+        .assign(
+            flag=lambda d: (
+                (
+                    d.seconds_change.gt(slower)
+                    & (d.seconds - d.baseline_seconds).ge(min_seconds)
+                ).map({True: "slower", False: ""})
+                + d.data_change.gt(larger).map({True: " more data", False: ""})
+            ).str.strip()
+        )
+        .reset_index()
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report slowdowns between runs")
+    parser.add_argument(
+        "--pipeline",
+        nargs="+",
+        default=["extract", "charts"],
+        help="pipelines to report on (default: extract charts)",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=int,
+        default=5,
+        help="number of previous runs to compare with (default: 5)",
+    )
+    parser.add_argument(
+        "--slower",
+        type=float,
+        default=25,
+        help="flag steps this percentage slower than usual (default: 25)",
+    )
+    parser.add_argument(
+        "--larger",
+        type=float,
+        default=50,
+        help="flag steps handling this percentage more data than usual (default: 50)",
+    )
+    parser.add_argument(
+        "--min-seconds",
+        type=float,
+        default=1,
+        help="ignore slowdowns of less than this many seconds (default: 1)",
+    )
+    parser.add_argument(
+        "--fail",
+        action="store_true",
+        help="exit with an error if any step is flagged",
+    )
+    args = parser.parse_args()
+
+    flagged = 0
+    for pipeline in args.pipeline:
+        steps = report(
+            pipeline, args.baseline, args.slower, args.larger, args.min_seconds
+        )
+        if steps.empty:
+            logger.info(f"No runs of {pipeline} recorded yet")
+            continue
+
+        logger.info(f"Latest run of {pipeline}:\n{steps.to_string(index=False)}")
+
+        for step in steps.loc[lambda d: d.flag != ""].itertuples():
+            flagged += 1
+            logger.warning(
+                f"{pipeline} {step.name} flagged ({step.flag}): {step.seconds:.1f}s "
+                f"({step.seconds_change:+.0f}% time, {step.data_change:+.0f}% data)"
+            )
+
+    if args.fail and flagged:
+        raise SystemExit(f"{flagged} steps got slower or handle more data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import pandas as pd
+
+from scripts import datasets
+from scripts.config import PATHS
+
+
+def _store() -> datasets.Store:
+    df = pd.DataFrame(
+        {
+            "indicator": ["a", "a", "b", "b"],
+            "entity": ["x", "y", "z", "x"],
+            "year": [2000, 2001, 2002, 2000],
+            "value": [1, 2, 3, 4],
+        }
+    )
+
+    return datasets.Store(df, ("indicator", "entity", "year"))
+
+
+def test_get_selects_indicator_entities_and_years():
+    store = _store()
+
+    assert store.get(indicator="a").value.tolist() == [1, 2]
+    assert store.get(indicator="a", entities=["z", "x"]).value.tolist() == [1]
+    assert store.get(entities="x", years=slice(2000, None)).value.tolist() == [1, 4]
+
+
+def test_get_ignores_labels_missing_from_the_index():
+    assert _store().get(indicator="c", entities=["x"]).empty
+
+
+def test_get_returns_nothing_for_labels_only_under_another_indicator():
+    store = _store()
+
+    # "z" and 2002 exist, but only under indicator "b"
+    assert store.get(indicator="a", entities=["z"]).empty
+    assert store.get(indicator="a", years=2002).empty
+    assert store.get(entities="z", years=2000).empty
+    assert list(store.get(indicator="a", years=2002).columns) == list(store.data)
+
+
+def test_world_bank_store_is_keyed_on_year_for_files_without_a_year(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(PATHS, "raw_data", tmp_path)
+    datasets.clear_cache()
+    pd.DataFrame(
+        {
+            "date": ["2019-01-01", "2020-01-01"],
+            "iso_code": ["FRA", "FRA"],
+            "indicator_code": ["SG.GEN.PARL.ZS", "SG.GEN.PARL.ZS"],
+            "value": [1.0, 2.0],
+        }
+    ).to_csv(tmp_path / "world_bank_gender.csv", index=False)
+
+    selected = datasets.store("world_bank_gender").get(years=2020)
+
+    assert selected.value.tolist() == [2.0]
+    datasets.clear_cache()
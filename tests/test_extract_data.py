@@ -0,0 +1,152 @@
+import pandas as pd
+import pytest
+
+from scripts import datasets
+from scripts.config import PATHS
+from scripts.extraction_tools import extract_data
+
+
+def test_world_bank_plan_requests_lagging_economies_from_their_own_start():
+    files = [
+        extract_data.WorldBankFile("a", db=2, indicators={"X": "x", "NEW": "new"}),
+        extract_data.WorldBankFile("b", db=14, indicators={"Y": "y"}),
+    ]
+    start_years = pd.Series(
+        [2019, 2010, 2018],
+        index=pd.MultiIndex.from_tuples(
+            [("X", "FRA"), ("X", "MLI"), ("Y", "FRA")],
+            names=["indicator_code", "iso_code"],
+        ),
+    )
+
+    queries = extract_data.world_bank_plan(files, start_years)
+
+    assert queries == [
+        extract_data.WorldBankQuery(2, ["NEW"]),
+        extract_data.WorldBankQuery(2, ["X"], start_year=2019),
+        extract_data.WorldBankQuery(
+            2, ["X"], start_year=2010, end_year=2018, economies=["MLI"]
+        ),
+        extract_data.WorldBankQuery(14, ["Y"], start_year=2018),
+    ]
+
+
+def test_world_bank_plan_requests_everything_in_full_without_start_years():
+    files = [
+        extract_data.WorldBankFile("a", db=14, indicators={"X": "x"}),
+        extract_data.WorldBankFile("b", db=14, indicators={"X": "x", "Y": "y"}),
+    ]
+
+    assert extract_data.world_bank_plan(files) == [
+        extract_data.WorldBankQuery(14, ["X", "Y"])
+    ]
+
+
+YEARS = range(2000, 2023)
+
+
+class FakeFetch:
+    """Stand-in for wbgapi.data.fetch, returning value = 10 * year for every
+    economy and year requested, and recording the calls"""
+
+    economies = ["FRA", "MLI"]
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, series, economy="all", time="all", db=None, **kwargs):
+        self.calls.append({"series": series, "economy": economy, "time": time})
+        for code in series:
+            for iso in self.economies if economy == "all" else economy:
+                for year in YEARS if time == "all" else time:
+                    yield {
+                        "series": code,
+                        "economy": iso,
+                        "time": year,
+                        "value": 10.0 * year,
+                    }
+
+
+@pytest.fixture
+def fake_wbgapi(monkeypatch):
+    fetch = FakeFetch()
+    monkeypatch.setattr(extract_data.wbgapi.data, "fetch", fetch)
+    monkeypatch.setattr(
+        extract_data.wbgapi.time,
+        "periods",
+        lambda db: {str(year): f"YR{year}" for year in YEARS},
+    )
+
+    return fetch
+
+
+def test_fetched_years_stay_within_the_periods_of_the_database(fake_wbgapi):
+    extract_data._fetch_wb_data(extract_data.WorldBankQuery(2, ["X"], start_year=2020))
+    extract_data._fetch_wb_data(
+        extract_data.WorldBankQuery(2, ["X"], start_year=2019, end_year=2030)
+    )
+    data = extract_data._fetch_wb_data(
+        extract_data.WorldBankQuery(2, ["X"], start_year=2025)
+    )
+
+    assert [call["time"] for call in fake_wbgapi.calls] == [
+        range(2020, 2023),
+        range(2019, 2023),
+    ]
+    assert data.empty
+
+
+@pytest.fixture
+def stored(tmp_path, monkeypatch):
+    """A stored World Bank file: FRA up to 2020, MLI (lagging) up to 2012"""
+
+    monkeypatch.setattr(PATHS, "raw_data", tmp_path)
+    monkeypatch.setattr(
+        extract_data,
+        "WB_FILES",
+        [extract_data.WorldBankFile("world_bank_gender", db=14, indicators={"X": "x"})],
+    )
+    # any month but the current one, so the run is not a full refresh
+    monkeypatch.setattr(
+        extract_data, "WB_FULL_REFRESH_MONTH", pd.Timestamp.now().month % 12 + 1
+    )
+    years = list(range(2015, 2021)) + list(range(2010, 2013))
+    pd.DataFrame(
+        {
+            "date": [f"{year}-01-01" for year in years],
+            "iso_code": ["FRA"] * 6 + ["MLI"] * 3,
+            "indicator_code": "X",
+            "value": [float(year) for year in years],
+        }
+    ).to_csv(tmp_path / "world_bank_gender.csv", index=False)
+
+
+def _read_values(iso_code: str) -> dict:
+    return (
+        pd.read_csv(datasets.raw_path("world_bank_gender"))
+        .loc[lambda d: d.iso_code == iso_code]
+        .set_index("year")["value"]
+        .to_dict()
+    )
+
+
+def test_world_bank_merges_the_revised_years_into_the_stored_file(stored, fake_wbgapi):
+    extract_data.world_bank()
+
+    # revised (2018-2020) and new years are replaced, older years are kept
+    assert _read_values("FRA") == {
+        **{year: float(year) for year in range(2015, 2018)},
+        **{year: 10.0 * year for year in range(2018, 2023)},
+    }
+    # MLI lags behind, so it is requested from its own start year
+    assert {"series": ["X"], "economy": ["MLI"], "time": range(2010, 2018)} in (
+        fake_wbgapi.calls
+    )
+    assert _read_values("MLI") == {year: 10.0 * year for year in range(2010, 2023)}
+
+
+def test_full_world_bank_extraction_rewrites_the_whole_history(stored, fake_wbgapi):
+    extract_data.world_bank(full=True)
+
+    assert fake_wbgapi.calls == [{"series": ["X"], "economy": "all", "time": "all"}]
+    assert _read_values("FRA") == {year: 10.0 * year for year in YEARS}
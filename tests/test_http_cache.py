@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import http.server
+import json
+import threading
+
+import pytest
+
+from scripts.extraction_tools import http_cache
+
+CONTENT = bytes(range(256)) * 20_000  # 5MB
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Serve a single file, with an ETag, supporting Range and If-Range
+
+    Class attributes set by the tests change the behaviour of the server.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    content = CONTENT
+    etag = '"v1"'
+    drops = 0  # number of responses cut after drop_after bytes
+    drop_after = 1_500_000
+    gzip = "never"  # "never", "if asked" or "always"
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        headers = {k: v for k, v in self.headers.items()}
+        type(self).requests.append(headers)
+
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, start = self.content, 0
+        compress = self.gzip == "always" or (
+            self.gzip == "if asked"
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        )
+        if compress:
+            body = gzip.compress(body)
+
+        if self.headers.get("Range") and self.headers.get("If-Range") == self.etag:
+            start = int(self.headers["Range"].removeprefix("bytes=").rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+        else:
+            self.send_response(200)
+
+        body = body[start:]
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+
+        if type(self).drops > 0:
+            type(self).drops -= 1
+            self.wfile.write(body[: self.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    class TestHandler(Handler):
+        requests = []
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), TestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    TestHandler.url = f"http://127.0.0.1:{httpd.server_port}/file.bin"
+    yield TestHandler
+
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_unchanged_file_is_revalidated_with_a_conditional_request(server, tmp_path):
+    path = http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    # a new cache object, as in a later run
+    assert http_cache.HttpCache(tmp_path).fetch(server.url) == path
+    assert path.read_bytes() == CONTENT
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+    assert len(server.requests) == 2
+
+
+def test_dropped_download_is_resumed_with_range(server, tmp_path):
+    server.drops = 2
+
+    path = http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    assert path.read_bytes() == CONTENT
+    assert len(server.requests) == 3
+    assert all(r["If-Range"] == '"v1"' for r in server.requests[1:])
+    assert all(r["Range"].startswith("bytes=") for r in server.requests[1:])
+    assert list((tmp_path / "partial").iterdir()) == []
+
+
+def test_partial_download_is_resumed_in_a_later_run(server, tmp_path):
+    server.drops = 10
+
+    with pytest.raises(ConnectionError):
+        http_cache.HttpCache(tmp_path, retries=1).fetch(server.url)
+
+    server.drops = 0
+    server.requests.clear()
+    path = http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    assert path.read_bytes() == CONTENT
+    assert len(server.requests) == 1
+    assert server.requests[0]["Range"] != "bytes=0-"
+
+
+def test_complete_partial_download_is_kept_and_revalidated(
+    server, tmp_path, monkeypatch
+):
+    def crash(src, dst):
+        raise KeyboardInterrupt
+
+    # the run stops once the download is complete, before moving it
+    with monkeypatch.context() as m:
+        m.setattr(http_cache.os, "replace", crash)
+        with pytest.raises(KeyboardInterrupt):
+            http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    path = http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    assert path.read_bytes() == CONTENT
+    assert len(server.requests) == 2
+    assert "Range" not in server.requests[1]
+    assert server.requests[1]["If-None-Match"] == '"v1"'
+    assert list((tmp_path / "partial").iterdir()) == []
+
+
+def test_unsatisfiable_range_is_downloaded_again_in_full(server, tmp_path):
+    cache = http_cache.HttpCache(tmp_path)
+
+    # a partial download longer than the file, e.g. of an older version
+    data, meta = cache._partial_paths(server.url)
+    data.write_bytes(CONTENT + b"older")
+    meta.write_text(
+        json.dumps(
+            {"etag": '"v1"', "last_modified": None, "size": None, "encoded": False}
+        )
+    )
+
+    path = cache.fetch(server.url)
+
+    assert path.read_bytes() == CONTENT
+    assert len(server.requests) == 2
+    assert server.requests[0]["Range"] == f"bytes={len(CONTENT) + 5}-"
+    assert "Range" not in server.requests[1]
+
+
+def test_changed_file_is_downloaded_again_when_resuming(server, tmp_path):
+    server.drops = 1
+    cache = http_cache.HttpCache(tmp_path, retries=0)
+    with pytest.raises(ConnectionError):
+        cache.fetch(server.url)
+
+    # If-Range does not match the new ETag, so the server sends a 200
+    server.etag = '"v2"'
+    server.content = CONTENT[::-1]
+    path = http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    assert server.requests[-1]["If-Range"] == '"v1"'
+    assert path.read_bytes() == CONTENT[::-1]
+
+
+def test_download_with_a_wrong_checksum_is_discarded(server, tmp_path):
+    cache = http_cache.HttpCache(tmp_path)
+
+    with pytest.raises(ValueError):
+        cache.fetch(server.url, sha256="0" * 64)
+
+    assert list((tmp_path / "partial").iterdir()) == []
+    assert list((tmp_path / "objects").iterdir()) == []
+
+    expected = hashlib.sha256(CONTENT).hexdigest()
+    assert cache.fetch(server.url, sha256=expected).name == expected
+
+
+@pytest.mark.parametrize("mode", ["if asked", "always"])
+def test_compressed_responses_are_stored_decompressed(server, tmp_path, mode):
+    server.gzip = mode
+
+    path = http_cache.HttpCache(tmp_path).fetch(server.url)
+
+    assert path.read_bytes() == CONTENT
+    assert server.requests[0]["Accept-Encoding"] == "identity"
+
+
+class ShortTransport:
+    """Transport sending a body of a different size than its Content-Length"""
+
+    def __init__(self, body: bytes, length: int):
+        self.body = body
+        self.length = length
+        self.calls = 0
+
+    def get(self, url: str, headers: dict) -> http_cache.Response:
+        self.calls += 1
+
+        return http_cache.Response(
+            status=200,
+            headers={"Content-Length": str(self.length)},
+            body=iter([self.body]),
+        )
+
+
+def test_body_shorter_than_its_content_length_is_retried_then_rejected(tmp_path):
+    transport = ShortTransport(b"abc", length=10)
+    cache = http_cache.HttpCache(tmp_path, transport=transport, retries=2)
+
+    with pytest.raises(ConnectionError):
+        cache.fetch("http://example.com/file.bin")
+
+    assert transport.calls == 3
+    assert list((tmp_path / "objects").iterdir()) == []
+
+
+def test_body_longer_than_its_content_length_is_rejected(tmp_path):
+    transport = ShortTransport(b"abcdefghijkl", length=10)
+    cache = http_cache.HttpCache(tmp_path, transport=transport)
+
+    with pytest.raises(ConnectionError):
+        cache.fetch("http://example.com/file.bin")
+
+    assert list((tmp_path / "objects").iterdir()) == []
+    assert list((tmp_path / "partial").iterdir()) == []
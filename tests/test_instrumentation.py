@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from scripts import datasets, instrumentation
+
+
+@pytest.fixture
+def enabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "REPORT", tmp_path / "profile.jsonl")
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+
+
+def _double(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.concat([df, df])
+
+
+def test_block_records_pipe_stages_and_rows_written(enabled, tmp_path):
+    with instrumentation.profile("chart"):
+        pd.DataFrame({"x": range(3)}).pipe(_double).to_csv(tmp_path / "out.csv")
+
+    records = instrumentation.report().set_index("name")
+
+    assert records.loc["_double", "parent"] == "chart"
+    assert records.loc["_double", ["rows_in", "rows_out"]].tolist() == [3, 6]
+    assert records.loc["chart", "rows_out"] == 6
+
+
+def test_functions_are_only_replaced_while_a_block_is_open(enabled):
+    pipe, load = pd.DataFrame.pipe, datasets.load
+
+    with pytest.raises(ZeroDivisionError):
+        with instrumentation.profile("chart"):
+            assert pd.DataFrame.pipe is not pipe
+            assert datasets.load is not load
+            1 / 0
+
+    assert pd.DataFrame.pipe is pipe
+    assert datasets.load is load
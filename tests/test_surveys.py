@@ -0,0 +1,149 @@
+import pandas as pd
+import pytest
+
+from scripts import surveys
+
+LABELS = {
+    "COUNTRY": {1: "Ghana", 2: "Kenya"},
+    "Q101": {1: "Male", 2: "Female", -1: "Missing"},
+    "Q16": {
+        1: "Agree very strongly with 1",
+        2: "Agree with 1",
+        3: "Agree with 2",
+        4: "Agree very strongly with 2",
+        5: "Agree with neither",
+    },
+}
+
+QUESTION = surveys.Question(
+    "Q16",
+    responses={
+        "Agree very strongly with 1": "strongly disagree",
+        "Agree very strongly with 2": "strongly agree",
+        "Agree with 1": "disagree",
+        "Agree with 2": "agree",
+    },
+    negative=("strongly disagree", "disagree"),
+)
+
+# every response is given at least once in each country and gender
+RESPONDENTS = pd.DataFrame(
+    [
+        # country, gender, response, weight
+        (1, 1, 1, 1.0),
+        (1, 1, 2, 0.5),
+        (1, 1, 3, 2.0),
+        (1, 1, 4, 1.5),
+        (1, 1, 4, 1.0),
+        (1, 1, 5, 3.0),
+        (1, 2, 1, 0.5),
+        (1, 2, 2, 1.0),
+        (1, 2, 3, 1.0),
+        (1, 2, 4, 2.0),
+        (1, -1, 4, 1.0),
+        (2, 1, 1, 2.0),
+        (2, 1, 2, 1.0),
+        (2, 1, 3, 1.0),
+        (2, 1, 4, 0.5),
+        (2, 2, 1, 1.0),
+        (2, 2, 2, 1.0),
+        (2, 2, 3, 0.5),
+        (2, 2, 4, 2.5),
+        (2, 2, 4, 1.0),
+        (2, -1, 2, 1.0),
+    ],
+    columns=["COUNTRY", "Q101", "Q16", "withinwt"],
+)
+
+
+def _crosstab(weight: str | None) -> pd.DataFrame:
+    return (
+        surveys.crosstab(
+            RESPONDENTS,
+            [QUESTION],
+            by="COUNTRY",
+            breakdown="Q101",
+            groups={"Female": "female", "Male": "male"},
+            labels=LABELS.get,
+            weight=weight,
+        )
+        .rename(columns={"COUNTRY": "country", "Q101": "gender"})
+        .pivot(index=["country", "gender"], columns="response", values="share")
+    )
+
+
+def _counted_shares() -> pd.DataFrame:
+    """The groupby, count and share chain crosstab replaced"""
+
+    return (
+        RESPONDENTS.assign(
+            gender=lambda d: d.Q101.map(LABELS["Q101"]),
+            country=lambda d: d.COUNTRY.map(LABELS["COUNTRY"]),
+            response=lambda d: d.Q16.map(LABELS["Q16"]),
+        )
+        .loc[
+            lambda d: d.response.isin(list(QUESTION.responses)),
+            ["country", "gender", "response"],
+        ]
+        .groupby(["country", "gender", "response"])
+        .size()
+        .reset_index(name="response_count")
+        .pivot(index=["country", "response"], columns="gender", values="response_count")
+        .fillna(0)
+        .assign(all=lambda d: d.sum(axis=1))
+        .drop(columns="Missing")
+        .assign(
+            female=lambda d: (d.Female / d.groupby(level=0)["Female"].transform("sum"))
+            * 100,
+            male=lambda d: (d.Male / d.groupby(level=0)["Male"].transform("sum")) * 100,
+            total=lambda d: (d["all"] / d.groupby(level=0)["all"].transform("sum"))
+            * 100,
+        )
+        .loc[:, ["female", "male", "total"]]
+        .rename(columns={"total": "all"})
+        .reset_index()
+        .melt(id_vars=["country", "response"], value_name="proportion")
+        .pivot(index=["country", "gender"], columns="response", values="proportion")
+        .assign(
+            **{
+                "Agree very strongly with 1": lambda d: d["Agree very strongly with 1"]
+                * -1,
+                "Agree with 1": lambda d: d["Agree with 1"] * -1,
+            }
+        )
+        .rename(columns=QUESTION.responses)
+    )
+
+
+def test_unweighted_crosstab_counts_respondents():
+    pd.testing.assert_frame_equal(
+        _crosstab(weight=None),
+        _counted_shares(),
+        check_like=True,
+        check_names=False,
+    )
+
+
+def test_weighted_crosstab_shares_are_weighted_proportions():
+    shares = _crosstab(weight="withinwt")
+
+    # Ghana, men: weights of 1, 0.5, 2 and 1.5 + 1 out of 6 (3 answered neither)
+    assert shares.loc[("Ghana", "male")].to_dict() == pytest.approx(
+        {
+            "strongly disagree": -100 / 6,
+            "disagree": -50 / 6,
+            "agree": 200 / 6,
+            "strongly agree": 250 / 6,
+        }
+    )
+    # Kenya, all respondents, including the one with a missing gender
+    assert shares.loc[("Kenya", "all")].to_dict() == pytest.approx(
+        {
+            "strongly disagree": -300 / 11.5,
+            "disagree": -300 / 11.5,
+            "agree": 150 / 11.5,
+            "strongly agree": 400 / 11.5,
+        }
+    )
+    # shares of each group add up to 100% of the respondents who gave a response
+    assert shares.abs().sum(axis=1).tolist() == pytest.approx([100] * 6)
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+
+from scripts import datasets
+from scripts.charts import update_charts
+from scripts.config import PATHS
+
+
+def chart_without_inputs():
+    pd.DataFrame({"x": [1]}).to_csv(PATHS.output / "built.csv", index=False)
+
+
+def chart_with_income_levels():
+    datasets.load("income_levels").to_csv(PATHS.output / "missing.csv", index=False)
+
+
+@pytest.fixture
+def folders(tmp_path, monkeypatch):
+    for name in ["raw_data", "output", "logs"]:
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(PATHS, name, tmp_path / name)
+    monkeypatch.setattr(update_charts, "MANIFEST", tmp_path / "manifest.json")
+    monkeypatch.setattr(update_charts.telemetry, "record", lambda *args: None)
+    datasets.clear_cache()
+    yield
+    datasets.clear_cache()
+
+
+def test_chart_with_a_missing_dataset_fails_while_others_are_built(folders):
+    charts = [
+        update_charts.Chart("built", chart_without_inputs),
+        update_charts.Chart(
+            "missing", chart_with_income_levels, datasets=("income_levels",)
+        ),
+    ]
+
+    current = update_charts.fingerprints(charts)
+    assert current["missing"] is None
+    assert update_charts.stale_charts(charts, current) == charts
+
+    with pytest.raises(RuntimeError, match="missing"):
+        update_charts.update_charts(charts)
+
+    assert (PATHS.output / "built.csv").exists()
+    assert list(update_charts._read_manifest()) == ["built"]
+
+
+def test_file_rewritten_during_the_run_is_hashed_again(tmp_path):
+    path = tmp_path / "file.csv"
+    path.write_text("a")
+    first = update_charts._file_hash(path)
+
+    path.write_text("bb")
+
+    assert update_charts._file_hash(path) != first